@@ -30,20 +30,22 @@ def mask_to_ce_target(mask):
 
 
 def compute_weight_mask(mask: np.ndarray, edge_weight=4) -> np.ndarray:
-    from skimage.morphology import binary_dilation, binary_erosion
+    binary_mask = (mask > 0).astype(np.uint8)
 
-    binary_mask = mask > 0
-    weight_mask = np.ones(mask.shape[:2]).astype(np.float32)
+    if not binary_mask.any():
+        return np.ones(mask.shape[:2], dtype=np.float32)
 
-    if binary_mask.any():
-        dilated = binary_dilation(binary_mask, structure=np.ones((5, 5), dtype=np.bool))
-        eroded = binary_erosion(binary_mask, structure=np.ones((5, 5), dtype=np.bool))
+    kernel = np.ones((5, 5), dtype=np.uint8)
+    dilated = cv2.dilate(binary_mask, kernel)
+    eroded = cv2.erode(binary_mask, kernel)
 
-        a = dilated & ~binary_mask
-        b = binary_mask & ~eroded
+    # Edge pixels are those that differ between dilated and eroded masks (eroded <= mask <= dilated)
+    edges = np.not_equal(dilated, eroded)
 
-        weight_mask = (a | b).astype(np.float32) * edge_weight + 1
-        weight_mask = cv2.GaussianBlur(weight_mask, ksize=(5, 5), sigmaX=5)
+    weight_mask = edges.astype(np.float32)
+    weight_mask *= edge_weight
+    weight_mask += 1
+    weight_mask = cv2.GaussianBlur(weight_mask, ksize=(5, 5), sigmaX=5)
     return weight_mask
 
 
@@ -12,7 +12,10 @@ from torch.utils.data.dataloader import default_collate
 
 class RandomSubsetDataset(Dataset):
     """
-    Wrapper to get desired number of samples from underlying dataset
+    Wrapper to get desired number of samples from underlying dataset.
+
+    Note: For uniform sampling, torch.utils.data.RandomSampler(dataset, replacement=True, num_samples=...)
+    is an equivalent alternative. Prefer either of them to WeightedRandomSampler with all-ones weights.
     """
 
     def __init__(self, dataset, num_samples: int, weights: Optional[np.ndarray] = None):
@@ -32,8 +35,8 @@ class RandomSubsetDataset(Dataset):
 
     def __getitem__(self, _) -> Any:
         if self.weights is not None:
-            population = range(len(self.dataset))
-            index = random.choices(population, cum_weights=self.weights, k=1)[0]
+            # Same as random.choices(cum_weights=...), but binary search runs in NumPy
+            index = int(np.searchsorted(self.weights, random.random() * self.weights[-1], side="right"))
         else:
             index = random.randrange(len(self.dataset))
         return self.dataset[index]
@@ -52,12 +55,7 @@ class RandomSubsetWithMaskDataset(Dataset):
     """
 
     def __init__(self, dataset: Dataset, mask: np.ndarray, num_samples: int):
-        if (
-            not isinstance(mask, np.ndarray)
-            or mask.dtype != np.bool
-            or len(mask.shape) != 1
-            or len(mask) != len(dataset)
-        ):
+        if not isinstance(mask, np.ndarray) or mask.dtype != bool or len(mask.shape) != 1 or len(mask) != len(dataset):
             raise ValueError("Mask must be boolean 1-D numpy array")
 
         if not mask.any():
@@ -2,146 +2,462 @@ import collections
 
 import torch
 from torch import nn, Tensor
-from typing import List, Union, Iterable, Optional, Dict, Tuple
+from typing import List, Union, Iterable, Optional, Dict, Tuple, Callable
 
 __all__ = ["ApplySoftmaxTo", "ApplySigmoidTo", "Ensembler", "PickModelOutput", "SelectByIndex", "average_checkpoints"]
 
 from pytorch_toolbelt.inference.tta import _deaugment_averaging
+from pytorch_toolbelt.utils.torch_utils import _record_stream
 
+# Reductions that can be computed with a running accumulator without stacking all predictions
+_STREAMING_REDUCTIONS = {"mean", "sum", "gmean", "geometric_mean", "hmean", "harmonic_mean"}
 
-class ApplySoftmaxTo(nn.Module):
-    output_keys: Tuple
+
+def _compile_module(module: Union[nn.Module, Callable], compile_mode: str, **kwargs) -> Union[nn.Module, Callable]:
+    """
+    Compile module (or function) with torch.compile. Note that first calls of the compiled module are slow,
+    since the graph is traced and compiled on the fly. Each new input shape may trigger recompilation.
+    State dict keys of compiled module get '_orig_mod.' prefix.
+
+    :param kwargs: Additional arguments passed to torch.compile (backend, dynamic, etc.)
+    """
+    _check_compile_available()
+    return torch.compile(module, mode=compile_mode, **kwargs)
+
+
+def _check_compile_available():
+    if not hasattr(torch, "compile"):
+        raise RuntimeError("torch.compile is not available. Compiling models requires PyTorch 2.0 or newer.")
+
+
+class _LazyCompiledForward:
+    """
+    Mixin for activation wrappers that compile their _forward method with torch.compile on the first call.
+    Compiled function is not part of the pickled state, so wrapped module can be pickled / deep-copied
+    and is compiled again after unpickling.
+    """
+
+    def _compiled_call(self, *input, **kwargs):
+        if self._compiled_forward is None:
+            self._compiled_forward = _compile_module(self._forward, self.compile_mode)
+        return self._compiled_forward(*input, **kwargs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_compiled_forward"] = None
+        return state
+
+
+class _ScriptableApplySoftmaxTo(nn.Module):
+    """
+    TorchScript counterpart of ApplySoftmaxTo that takes a single input tensor.
+    """
+
+    output_keys: List[str]
     temperature: float
     dim: int
 
+    def __init__(self, model: nn.Module, output_keys: List[str], dim: int, temperature: float):
+        super().__init__()
+        self.output_keys = output_keys
+        self.model = model
+        self.dim = dim
+        self.temperature = temperature
+
+    def forward(self, x: Tensor) -> Dict[str, Tensor]:  # skipcq: PYL-W0221
+        return self._activate(self.model(x))
+
+    def _activate(self, output: Dict[str, Tensor]) -> Dict[str, Tensor]:
+        for key in self.output_keys:
+            output[key] = output[key].mul(self.temperature).softmax(dim=self.dim)
+        return output
+
+
+class ApplySoftmaxTo(_LazyCompiledForward, _ScriptableApplySoftmaxTo):
     def __init__(
         self,
         model: nn.Module,
         output_key: Union[str, int, Iterable[str]] = "logits",
         dim: int = 1,
         temperature: float = 1,
+        compile_model: bool = False,
+        compile_mode: str = "reduce-overhead",
     ):
         """
-        Apply softmax activation on given output(s) of the model
+        Apply softmax activation on given output(s) of the model.
+        When converted with torch.jit.script, wrapped model must take a single tensor and return Dict[str, Tensor].
         :param model: Model to wrap
         :param output_key: string, index or list of strings, indicating to what outputs softmax activation should be applied.
         :param dim: Tensor dimension for softmax activation
         :param temperature: Temperature scaling coefficient. Values > 1 will make logits sharper.
+        :param compile_model: If True, wrapped model and activation are compiled together with torch.compile.
+            First calls are slow due to compilation (warm-up).
+        :param compile_mode: Compilation mode passed to torch.compile
         """
+        # By removing duplicates, we prevent double-activation by passing output_key=["logits", "logits"]
+        output_key = [output_key] if isinstance(output_key, (str, int)) else list(dict.fromkeys(output_key))
+        super().__init__(model, output_key, dim, float(temperature))
+        if compile_model:
+            _check_compile_available()
+        self.compile_mode = compile_mode if compile_model else None
+        self._compiled_forward = None
+
+    def forward(self, *input, **kwargs):  # skipcq: PYL-W0221
+        if self.compile_mode is not None:
+            return self._compiled_call(*input, **kwargs)
+        return self._forward(*input, **kwargs)
+
+    def _forward(self, *input, **kwargs):
+        return self._activate(self.model(*input, **kwargs))
+
+    def __prepare_scriptable__(self):
+        # TorchScript cannot compile *input/**kwargs signature, so single-input counterpart is scripted instead
+        return _ScriptableApplySoftmaxTo(self.model, self.output_keys, self.dim, self.temperature)
+
+
+class _ScriptableApplySigmoidTo(nn.Module):
+    """
+    TorchScript counterpart of ApplySigmoidTo that takes a single input tensor.
+    """
+
+    output_keys: List[str]
+    temperature: float
+
+    def __init__(self, model: nn.Module, output_keys: List[str], temperature: float):
         super().__init__()
-        # By converting to set, we prevent double-activation by passing output_key=["logits", "logits"]
-        output_key = (output_key,) if isinstance(output_key, (str, int)) else tuple(set(output_key))
-        self.output_keys = output_key
+        self.output_keys = output_keys
         self.model = model
-        self.dim = dim
         self.temperature = temperature
 
-    def forward(self, *input, **kwargs):
-        output = self.model(*input, **kwargs)
+    def forward(self, x: Tensor) -> Dict[str, Tensor]:  # skipcq: PYL-W0221
+        return self._activate(self.model(x))
+
+    def _activate(self, output: Dict[str, Tensor]) -> Dict[str, Tensor]:
         for key in self.output_keys:
-            output[key] = output[key].mul(self.temperature).softmax(dim=self.dim)
+            output[key] = output[key].mul(self.temperature).sigmoid_()
         return output
 
 
-class ApplySigmoidTo(nn.Module):
-    output_keys: Tuple
-    temperature: float
-
-    def __init__(self, model: nn.Module, output_key: Union[str, int, Iterable[str]] = "logits", temperature=1):
+class ApplySigmoidTo(_LazyCompiledForward, _ScriptableApplySigmoidTo):
+    def __init__(
+        self,
+        model: nn.Module,
+        output_key: Union[str, int, Iterable[str]] = "logits",
+        temperature=1,
+        compile_model: bool = False,
+        compile_mode: str = "reduce-overhead",
+    ):
         """
-        Apply sigmoid activation on given output(s) of the model
+        Apply sigmoid activation on given output(s) of the model.
+        When converted with torch.jit.script, wrapped model must take a single tensor and return Dict[str, Tensor].
         :param model: Model to wrap
         :param output_key: string index, or list of strings, indicating to what outputs sigmoid activation should be applied.
         :param temperature: Temperature scaling coefficient. Values > 1 will make logits sharper.
+        :param compile_model: If True, wrapped model and activation are compiled together with torch.compile.
+            First calls are slow due to compilation (warm-up).
+        :param compile_mode: Compilation mode passed to torch.compile
         """
-        super().__init__()
-        # By converting to set, we prevent double-activation by passing output_key=["logits", "logits"]
-        output_key = (output_key,) if isinstance(output_key, (str, int)) else tuple(set(output_key))
-        self.output_keys = output_key
-        self.model = model
-        self.temperature = temperature
+        # By removing duplicates, we prevent double-activation by passing output_key=["logits", "logits"]
+        output_key = [output_key] if isinstance(output_key, (str, int)) else list(dict.fromkeys(output_key))
+        super().__init__(model, output_key, float(temperature))
+        if compile_model:
+            _check_compile_available()
+        self.compile_mode = compile_mode if compile_model else None
+        self._compiled_forward = None
 
     def forward(self, *input, **kwargs):  # skipcq: PYL-W0221
-        output = self.model(*input, **kwargs)
-        for key in self.output_keys:
-            output[key] = output[key].mul(self.temperature).sigmoid_()
-        return output
+        if self.compile_mode is not None:
+            return self._compiled_call(*input, **kwargs)
+        return self._forward(*input, **kwargs)
 
+    def _forward(self, *input, **kwargs):
+        return self._activate(self.model(*input, **kwargs))
 
-class Ensembler(nn.Module):
-    __slots__ = ["outputs", "reduction", "return_some_outputs"]
+    def __prepare_scriptable__(self):
+        # TorchScript cannot compile *input/**kwargs signature, so single-input counterpart is scripted instead
+        return _ScriptableApplySigmoidTo(self.model, self.output_keys, self.temperature)
+
+
+def _accumulate_prediction(accumulator: Optional[Tensor], x: Tensor, index: int, reduction: str) -> Tensor:
+    """
+    Add prediction of the model to the running accumulator.
+
+    :param accumulator: Running accumulator (None for the first model)
+    :param x: Prediction of the model
+    :param index: Index of the model
+    :param reduction: Reduction mode (one of _STREAMING_REDUCTIONS)
+    :return: Updated accumulator
+    """
+    if reduction in {"gmean", "geometric_mean"}:
+        x = x.log()
+    elif reduction in {"hmean", "harmonic_mean"}:
+        x = torch.reciprocal(x.clamp_min(1e-6))
+
+    if index == 0:
+        return x
+    if index == 1:
+        # Out-of-place to not modify output of the first model
+        return accumulator + x
+    return accumulator.add_(x)
+
+
+def _finalize_prediction(accumulator: Tensor, num_models: int, reduction: str) -> Tensor:
+    if reduction == "sum":
+        return accumulator
+    accumulator = accumulator / num_models
+    if reduction in {"gmean", "geometric_mean"}:
+        return accumulator.exp_()
+    if reduction in {"hmean", "harmonic_mean"}:
+        return torch.reciprocal(accumulator.clamp_min_(1e-6))
+    return accumulator
+
+
+# Element-wise transform applied to predictions before/after averaging in fused reductions
+_FUSED_REDUCTION_MODE = {
+    "mean": 0,
+    "sum": 0,
+    "gmean": 1,
+    "geometric_mean": 1,
+    "hmean": 2,
+    "harmonic_mean": 2,
+}
+
+
+@torch.jit.script
+def _safe_reciprocal(x: Tensor) -> Tensor:
+    return torch.reciprocal(x.clamp_min(1e-6))
+
+
+@torch.jit.script
+def _fused_reduce_2(x0: Tensor, x1: Tensor, mode: int, scale: float) -> Tensor:
+    if mode == 1:
+        return torch.exp((x0.log() + x1.log()) * scale)
+    if mode == 2:
+        return _safe_reciprocal((_safe_reciprocal(x0) + _safe_reciprocal(x1)) * scale)
+    return (x0 + x1) * scale
+
+
+@torch.jit.script
+def _fused_reduce_3(x0: Tensor, x1: Tensor, x2: Tensor, mode: int, scale: float) -> Tensor:
+    if mode == 1:
+        return torch.exp((x0.log() + x1.log() + x2.log()) * scale)
+    if mode == 2:
+        return _safe_reciprocal((_safe_reciprocal(x0) + _safe_reciprocal(x1) + _safe_reciprocal(x2)) * scale)
+    return (x0 + x1 + x2) * scale
+
+
+@torch.jit.script
+def _fused_reduce_4(x0: Tensor, x1: Tensor, x2: Tensor, x3: Tensor, mode: int, scale: float) -> Tensor:
+    if mode == 1:
+        return torch.exp((x0.log() + x1.log() + x2.log() + x3.log()) * scale)
+    if mode == 2:
+        return _safe_reciprocal(
+            (_safe_reciprocal(x0) + _safe_reciprocal(x1) + _safe_reciprocal(x2) + _safe_reciprocal(x3)) * scale
+        )
+    return (x0 + x1 + x2 + x3) * scale
+
+
+@torch.jit.script
+def _fused_reduce_5(x0: Tensor, x1: Tensor, x2: Tensor, x3: Tensor, x4: Tensor, mode: int, scale: float) -> Tensor:
+    if mode == 1:
+        return torch.exp((x0.log() + x1.log() + x2.log() + x3.log() + x4.log()) * scale)
+    if mode == 2:
+        return _safe_reciprocal(
+            (
+                _safe_reciprocal(x0)
+                + _safe_reciprocal(x1)
+                + _safe_reciprocal(x2)
+                + _safe_reciprocal(x3)
+                + _safe_reciprocal(x4)
+            )
+            * scale
+        )
+    return (x0 + x1 + x2 + x3 + x4) * scale
+
+
+# Unrolled reductions for small number of models. Kept in module-level dict (not as Ensembler attribute),
+# since script functions cannot be pickled or deep-copied together with the model.
+_FUSED_REDUCTIONS = {2: _fused_reduce_2, 3: _fused_reduce_3, 4: _fused_reduce_4, 5: _fused_reduce_5}
 
+
+class Ensembler(nn.Module):
     """
     Compute sum (or average) of outputs of several models.
+    Note: Ensembler itself is not scriptable, but its members (e.g. ApplySoftmaxTo/ApplySigmoidTo wrappers)
+    can be converted with torch.jit.script beforehand.
     """
 
-    def __init__(self, models: List[nn.Module], reduction: str = "mean", outputs: Optional[Iterable[str]] = None):
+    __slots__ = ["outputs", "reduction", "return_some_outputs"]
+
+    def __init__(
+        self,
+        models: List[nn.Module],
+        reduction: str = "mean",
+        outputs: Optional[Iterable[str]] = None,
+        use_cuda_streams: bool = False,
+        compile_model: bool = False,
+        compile_mode: str = "reduce-overhead",
+    ):
         """
 
         :param models:
         :param reduction: Reduction key ('mean', 'sum', 'gmean', 'hmean' or None)
         :param outputs: Name of model outputs to average and return from Ensembler.
             If None, all outputs from the first model will be used.
+        :param use_cuda_streams: If True, each model is executed on it's own CUDA stream, so
+            models that underutilize GPU can run concurrently. Has effect only for CUDA inputs.
+        :param compile_model: If True, each model is compiled with torch.compile. This reduces per-call
+            overhead for fixed input shapes, but first calls are slow due to compilation (warm-up).
+            Note that state dict keys of compiled models get '_orig_mod.' prefix.
+        :param compile_mode: Compilation mode passed to torch.compile
         """
         super().__init__()
         self.return_some_outputs = outputs is not None
         self.outputs = tuple(outputs) if outputs else tuple()
+        if compile_model:
+            models = [_compile_module(model, compile_mode) for model in models]
         self.models = nn.ModuleList(models)
         self.reduction = reduction
-
-    def forward(self, *input, **kwargs):  # skipcq: PYL-W0221
-        outputs = [model(*input, **kwargs) for model in self.models]
-        output_is_dict = isinstance(outputs[0], dict)
-        output_is_list = isinstance(outputs[0], (list, tuple))
-
+        self.use_cuda_streams = use_cuda_streams
+        self._streams = None
+        self._streaming_reduction = reduction in _STREAMING_REDUCTIONS
+        # For 2..5 models, outputs are reduced with a single unrolled scripted function
+        self._fused_reduction = self._streaming_reduction and len(models) in _FUSED_REDUCTIONS
+        self._fused_reduction_mode = _FUSED_REDUCTION_MODE.get(reduction, 0)
+        self._fused_reduction_scale = 1.0 if reduction == "sum" else 1.0 / len(models)
+        # Keys of outputs to reduce and whether output is a dict. Inferred from the first output and cached.
+        self._output_schema: Optional[Tuple[Optional[Tuple], bool]] = None
+
+    def _infer_output_schema(self, output) -> Tuple[Optional[Tuple], bool]:
+        output_is_dict = isinstance(output, dict)
         if self.return_some_outputs:
             keys = self.outputs
-        elif isinstance(outputs[0], dict):
-            keys = outputs[0].keys()
-        elif isinstance(outputs[0], (list, tuple)):
-            keys = list(range(len(outputs[0])))
-        elif torch.is_tensor(outputs[0]):
+        elif output_is_dict:
+            keys = tuple(output.keys())
+        elif isinstance(output, (list, tuple)):
+            keys = tuple(range(len(output)))
+        elif torch.is_tensor(output):
             keys = None
         else:
-            raise RuntimeError()
+            raise RuntimeError(f"Unsupported type of model output {type(output)}")
+        return keys, output_is_dict
+
+    def _get_cuda_device(self, *input) -> Optional[torch.device]:
+        if not self.use_cuda_streams or len(self.models) < 2:
+            return None
+        for x in input:
+            if torch.is_tensor(x) and x.is_cuda:
+                return x.device
+        return None
+
+    def _run_models_on_streams(self, device: torch.device, *input, **kwargs) -> List:
+        if self._streams is None or self._streams[0].device != device:
+            self._streams = [torch.cuda.Stream(device=device) for _ in self.models]
+
+        current_stream = torch.cuda.current_stream(device)
+        outputs = []
+        for model, stream in zip(self.models, self._streams):
+            # Inputs are produced on the current stream, so wait for them
+            stream.wait_stream(current_stream)
+            _record_stream(input, stream)
+            _record_stream(kwargs, stream)
+            with torch.cuda.stream(stream):
+                outputs.append(model(*input, **kwargs))
+
+        for stream in self._streams:
+            current_stream.wait_stream(stream)
+        _record_stream(outputs, current_stream)
+        return outputs
 
-        if keys is None:
-            predictions = torch.stack(outputs)
-            predictions = _deaugment_averaging(predictions, self.reduction)
-            averaged_output = predictions
+    def forward(self, *input, **kwargs):  # skipcq: PYL-W0221
+        device = self._get_cuda_device(*input)
+        if device is not None:
+            outputs = iter(self._run_models_on_streams(device, *input, **kwargs))
         else:
-            averaged_output = {} if output_is_dict else []
-            for key in keys:
-                predictions = [output[key] for output in outputs]
-                predictions = torch.stack(predictions)
-                predictions = _deaugment_averaging(predictions, self.reduction)
-                if output_is_dict:
-                    averaged_output[key] = predictions
-                else:
-                    averaged_output.append(predictions)
+            # Lazily evaluated, so that outputs of each model can be freed once accumulated
+            outputs = (model(*input, **kwargs) for model in self.models)
+
+        first_output = next(outputs)
+        if self._output_schema is None:
+            self._output_schema = self._infer_output_schema(first_output)
+        keys, output_is_dict = self._output_schema
+
+        def select(output) -> List[Tensor]:
+            return [output] if keys is None else [output[key] for key in keys]
+
+        if self._fused_reduction:
+            reduce = _FUSED_REDUCTIONS[len(self.models)]
+            all_predictions = [select(first_output)] + [select(output) for output in outputs]
+            predictions = [
+                reduce(*key_predictions, self._fused_reduction_mode, self._fused_reduction_scale)
+                for key_predictions in zip(*all_predictions)
+            ]
+        elif self._streaming_reduction:
+            # Reduce predictions on the fly instead of stacking them into [N, B, ...] tensor
+            accumulators = select(first_output)
+            accumulators = [_accumulate_prediction(None, x, 0, self.reduction) for x in accumulators]
+            num_models = 1
+            for output in outputs:
+                accumulators = [
+                    _accumulate_prediction(acc, x, num_models, self.reduction)
+                    for acc, x in zip(accumulators, select(output))
+                ]
+                num_models += 1
+            predictions = [_finalize_prediction(acc, num_models, self.reduction) for acc in accumulators]
+        else:
+            all_predictions = [select(first_output)] + [select(output) for output in outputs]
+            predictions = [
+                _deaugment_averaging(torch.stack(key_predictions), self.reduction)
+                for key_predictions in zip(*all_predictions)
+            ]
+
+        if keys is None:
+            return predictions[0]
+        if output_is_dict:
+            return dict(zip(keys, predictions))
+        return predictions
+
+
+class _ScriptablePickModelOutput(nn.Module):
+    """
+    TorchScript counterpart of PickModelOutput that takes a single input tensor.
+    """
+
+    target_key: str
+
+    def __init__(self, model: nn.Module, key: Union[str, int]):
+        super().__init__()
+        self.model = model
+        # For integer keys target_index is set. Otherwise it is None and TorchScript drops the index branch.
+        self.target_key = str(key)
+        self.target_index = key if isinstance(key, int) else None
 
-        return averaged_output
+    def forward(self, x: Tensor) -> Tensor:  # skipcq: PYL-W0221
+        return self._pick(self.model(x))
 
+    def _pick(self, output: Dict[str, Tensor]) -> Tensor:
+        if self.target_index is None:
+            return output[self.target_key]
+        return output[self.target_index]
 
-class PickModelOutput(nn.Module):
+
+class PickModelOutput(_ScriptablePickModelOutput):
     """
     Wraps a model that returns dict or list and returns only a specific element.
+    When converted with torch.jit.script, wrapped model must take a single tensor and return Dict[str, Tensor].
 
     Usage example:
         >>> model = MyAwesomeSegmentationModel() # Returns dict {"OUTPUT_MASK": Tensor, ...}
         >>> net  = nn.Sequential(PickModelOutput(model, "OUTPUT_MASK")), nn.Sigmoid())
     """
 
-    __slots__ = ["target_key"]
-
-    def __init__(self, model: nn.Module, key: Union[str, int]):
-        super().__init__()
-        self.model = model
-        self.target_key = key
+    def forward(self, *input, **kwargs) -> Tensor:  # skipcq: PYL-W0221
+        return self._pick(self.model(*input, **kwargs))
 
-    def forward(self, *input, **kwargs) -> Tensor:
-        output = self.model(*input, **kwargs)
-        return output[self.target_key]
+    def __prepare_scriptable__(self):
+        # TorchScript cannot compile *input/**kwargs signature, so single-input counterpart is scripted instead
+        key = self.target_key if self.target_index is None else self.target_index
+        return _ScriptablePickModelOutput(self.model, key)
 
 
 class SelectByIndex(nn.Module):
@@ -151,16 +467,22 @@ class SelectByIndex(nn.Module):
     Usage example:
         >>> model = MyAwesomeSegmentationModel() # Returns dict {"OUTPUT_MASK": Tensor, ...}
         >>> net  = nn.Sequential(model, SelectByIndex("OUTPUT_MASK"), nn.Sigmoid())
+
+    Note: With TorchScript only string keys are supported, since input is annotated as Dict[str, Tensor].
     """
 
-    __slots__ = ["target_key"]
+    target_key: str
 
     def __init__(self, key: Union[str, int]):
         super().__init__()
-        self.target_key = key
+        # For integer keys target_index is set. Otherwise it is None and TorchScript drops the index branch.
+        self.target_key = str(key)
+        self.target_index = key if isinstance(key, int) else None
 
     def forward(self, outputs: Dict[str, Tensor]) -> Tensor:
-        return outputs[self.target_key]
+        if self.target_index is None:
+            return outputs[self.target_key]
+        return outputs[self.target_index]
 
 
 def average_checkpoints(inputs: List[str]) -> collections.OrderedDict:
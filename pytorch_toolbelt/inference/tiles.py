@@ -3,13 +3,15 @@ in a sliding-window fashion and merging prediction mask back to full-resolution.
 """
 import dataclasses
 import math
-from typing import List, Iterable, Tuple, Union, Sequence
+from typing import List, Iterable, Tuple, Union, Sequence, Callable, Optional
 
 import cv2
 import numpy as np
 import torch
+import torch.nn.functional as F
+from torch import Tensor
 
-__all__ = ["ImageSlicer", "TileMerger", "compute_pyramid_patch_weight_loss"]
+__all__ = ["ImageSlicer", "TileMerger", "compute_pyramid_patch_weight_loss", "predict_tiled"]
 
 
 def compute_pyramid_patch_weight_loss(width: int, height: int) -> np.ndarray:
@@ -347,3 +349,69 @@ class TileMerger:
     def merge_(self) -> torch.Tensor:
         self.image /= self.norm_mask
         return self.image
+
+
+def predict_tiled(
+    model: Callable[[Tensor], Tensor],
+    image: Tensor,
+    tile_size: Union[int, Tuple[int, int]],
+    tile_step: Union[int, Tuple[int, int], None] = None,
+    batch_size: int = 16,
+    weight: Union[np.ndarray, Tensor, None] = None,
+) -> Tensor:
+    """
+    Run model on image in sliding-window fashion entirely on the device of the input image.
+    Tiles are extracted with F.unfold and processed in batches, predictions are merged back with F.fold.
+    Compared to ImageSlicer + TileMerger this avoids Python-level per-tile slicing and accumulation.
+
+    Note: All tiles of the image are materialized at once, so memory usage grows with the tiles overlap.
+    Note: Tile grid starts at the top-left corner and the image is padded with zeros at the bottom/right so that
+    tiles cover it entirely. ImageSlicer instead centers the grid and pads the image at all borders,
+    so results of ImageSlicer + TileMerger are not identical near the image borders.
+
+    :param model: Model that takes [N,C,th,tw] tensor and returns [N,K,th,tw] tensor
+    :param image: Input image(s) of [B,C,H,W] shape
+    :param tile_size: Tile size (Scalar or tuple (H, W))
+    :param tile_step: Step in pixels between tiles (Scalar or tuple (H, W)). If None, equals to tile_size
+    :param batch_size: Number of tiles to process at once
+    :param weight: Optional weight matrix of [th, tw] shape for merging overlapping tiles
+        (e.g. ImageSlicer(..., weight="pyramid").weight). If None, overlapping predictions are averaged.
+    :return: Predictions of [B,K,H,W] shape
+    """
+    tile_size = (int(tile_size), int(tile_size)) if isinstance(tile_size, (int, np.integer)) else tuple(tile_size)
+    if tile_step is None:
+        tile_step = tile_size
+    tile_step = (int(tile_step), int(tile_step)) if isinstance(tile_step, (int, np.integer)) else tuple(tile_step)
+
+    if tile_step[0] < 1 or tile_step[0] > tile_size[0] or tile_step[1] < 1 or tile_step[1] > tile_size[1]:
+        raise ValueError(f"Tile step {tile_step} must be in range [1, {tile_size}]")
+
+    batch, channels, rows, cols = image.size()
+
+    # Pad image so that tiles cover it entirely
+    padded_rows = max(0, math.ceil((rows - tile_size[0]) / tile_step[0])) * tile_step[0] + tile_size[0]
+    padded_cols = max(0, math.ceil((cols - tile_size[1]) / tile_step[1])) * tile_step[1] + tile_size[1]
+    image = F.pad(image, [0, padded_cols - cols, 0, padded_rows - rows])
+
+    # [B, C * th * tw, L] -> [B * L, C, th, tw]
+    tiles = F.unfold(image, kernel_size=tile_size, stride=tile_step)
+    num_tiles = tiles.size(2)
+    tiles = tiles.transpose(1, 2).reshape(batch * num_tiles, channels, tile_size[0], tile_size[1])
+
+    predictions = torch.cat([model(chunk) for chunk in torch.split(tiles, batch_size)])
+    del tiles
+
+    if weight is None:
+        weight = torch.ones(tile_size, device=predictions.device, dtype=predictions.dtype)
+    else:
+        weight = torch.as_tensor(weight).to(device=predictions.device, dtype=predictions.dtype)
+
+    # [B * L, K, th, tw] -> [B, K * th * tw, L]
+    predictions = predictions * weight
+    predictions = predictions.reshape(batch, num_tiles, -1).transpose(1, 2)
+    output = F.fold(predictions, output_size=(padded_rows, padded_cols), kernel_size=tile_size, stride=tile_step)
+
+    norm_mask = weight.reshape(1, -1, 1).expand(1, -1, num_tiles)
+    norm_mask = F.fold(norm_mask, output_size=(padded_rows, padded_cols), kernel_size=tile_size, stride=tile_step)
+    output = output / norm_mask.clamp_min(torch.finfo(norm_mask.dtype).eps)
+    return output[:, :, :rows, :cols]
@@ -7,6 +7,7 @@ from torch import nn, Tensor
 __all__ = ["BalancedBCEWithLogitsLoss", "balanced_binary_cross_entropy_with_logits"]
 
 
+@torch.cuda.amp.autocast(False)
 def balanced_binary_cross_entropy_with_logits(
     logits: Tensor, targets: Tensor, gamma: float = 1.0, ignore_index: Optional[int] = None, reduction: str = "mean"
 ) -> Tensor:
@@ -24,6 +25,9 @@ def balanced_binary_cross_entropy_with_logits(
         Zero-sized tensor with reduced loss if `reduction` is `sum` or `mean`; Otherwise returns loss of the
         shape of `logits` tensor.
     """
+    logits = logits.float()
+    targets = targets.float()
+
     pos_targets: Tensor = targets.eq(1).sum()
     neg_targets: Tensor = targets.eq(0).sum()
 
@@ -1,5 +1,6 @@
 from typing import Optional
 
+import torch
 import torch.nn.functional as F
 from torch import nn, Tensor
 
@@ -25,7 +26,11 @@ class SoftBCEWithLogitsLoss(nn.Module):
         self.register_buffer("weight", weight)
         self.register_buffer("pos_weight", pos_weight)
 
+    @torch.cuda.amp.autocast(False)
     def forward(self, input: Tensor, target: Tensor) -> Tensor:
+        # Loss is always computed in FP32 for numerical stability under mixed precision
+        input = input.float()
+
         if self.smooth_factor is not None:
             soft_targets = ((1 - target) * self.smooth_factor + target * (1 - self.smooth_factor)).type_as(input)
         else:
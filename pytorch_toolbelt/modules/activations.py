@@ -1,7 +1,7 @@
 from collections import OrderedDict
 
 import torch
-from torch import nn
+from torch import nn, Tensor
 from torch.nn import functional as F
 
 from .identity import Identity
@@ -69,12 +69,12 @@ ACT_SOFTMAX = "softmax"
 
 
 @torch.jit.script
-def swish_jit_fwd(x):
+def swish_jit_fwd(x: Tensor) -> Tensor:
     return x.mul(torch.sigmoid(x))
 
 
 @torch.jit.script
-def swish_jit_bwd(x, grad_output):
+def swish_jit_bwd(x: Tensor, grad_output: Tensor) -> Tensor:
     x_sigmoid = torch.sigmoid(x)
     return grad_output * (x_sigmoid * (1 + x * (1 - x_sigmoid)))
 
@@ -100,8 +100,16 @@ class SwishFunction(torch.autograd.Function):
         return swish_jit_bwd(x, grad_output)
 
 
-def swish(x):
-    return SwishFunction.apply(x)
+def swish(x: Tensor) -> Tensor:
+    """
+    Apply the swish function element-wise: swish(x) = x * sigmoid(x)
+
+    When no gradient is required (inference), native fused F.silu kernel is used.
+    Otherwise, memory-efficient SwishFunction that stores only the input tensor is used.
+    """
+    if x.requires_grad and torch.is_grad_enabled():
+        return SwishFunction.apply(x)
+    return F.silu(x)
 
 
 def swish_naive(x):
@@ -127,12 +135,12 @@ class MishNaive(nn.Module):
 
 
 @torch.jit.script
-def mish_jit_fwd(x):
+def mish_jit_fwd(x: Tensor) -> Tensor:
     return x.mul(torch.tanh(F.softplus(x)))
 
 
 @torch.jit.script
-def mish_jit_bwd(x, grad_output):
+def mish_jit_bwd(x: Tensor, grad_output: Tensor) -> Tensor:
     x_sigmoid = torch.sigmoid(x)
     x_tanh_sp = F.softplus(x).tanh()
     return grad_output.mul(x_tanh_sp + x * x_sigmoid * (1 - x_tanh_sp * x_tanh_sp))
@@ -155,14 +163,19 @@ class MishFunction(torch.autograd.Function):
         return mish_jit_bwd(x, grad_output)
 
 
-def mish(x):
+def mish(x: Tensor) -> Tensor:
     """
     Apply the mish function element-wise:
     mish(x) = x * tanh(softplus(x)) = x * tanh(ln(1 + exp(x)))
     See additional documentation for mish class.
+
+    When no gradient is required (inference), native fused F.mish kernel is used.
+    Otherwise, memory-efficient MishFunction that stores only the input tensor is used.
     Credit: https://github.com/digantamisra98/Mish
     """
-    return MishFunction.apply(x)
+    if x.requires_grad and torch.is_grad_enabled():
+        return MishFunction.apply(x)
+    return F.mish(x)
 
 
 class Mish(nn.Module):
@@ -195,12 +208,20 @@ class Mish(nn.Module):
         return mish(input)
 
 
-def hard_sigmoid(x, inplace=False):
-    return F.relu6(x + 3, inplace) / 6
+def hard_sigmoid(x: Tensor, inplace: bool = False) -> Tensor:
+    """
+    Apply the hard sigmoid function element-wise: relu6(x + 3) / 6
+    Dispatches to the native fused kernel, so the whole expression is computed in a single pass.
+    """
+    return F.hardsigmoid(x, inplace=inplace)
 
 
-def hard_swish(x, inplace=False):
-    return x * hard_sigmoid(x, inplace)
+def hard_swish(x: Tensor, inplace: bool = False) -> Tensor:
+    """
+    Apply the hard swish function element-wise: x * relu6(x + 3) / 6
+    Dispatches to the native fused kernel, so the whole expression is computed in a single pass.
+    """
+    return F.hardswish(x, inplace=inplace)
 
 
 class HardSigmoid(nn.Module):
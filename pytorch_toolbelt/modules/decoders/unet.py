@@ -4,6 +4,7 @@ import torch
 import logging
 
 from torch import nn
+from torch.utils.checkpoint import checkpoint
 
 from pytorch_toolbelt.modules.unet import UnetBlock, UnetResidualBlock
 from pytorch_toolbelt.modules.interfaces import AbstractDecoder, FeatureMapsSpecification
@@ -34,7 +35,15 @@ class UNetDecoder(AbstractDecoder):
         block_kwargs=None,
         unet_block=None,
         num_blocks_per_stage: Union[None, int, Tuple[int, ...]] = None,
+        gradient_checkpointing: bool = False,
     ):
+        """
+
+        :param gradient_checkpointing: If True, activations of decoder blocks are not stored during training,
+            but recomputed in backward pass. This trades extra compute for a large reduction of memory
+            usage, since decoder blocks operate at the highest spatial resolution.
+            Note that running statistics of BatchNorm layers are updated twice per training step.
+        """
         num_stages = len(input_spec) - 1  # Number of outputs is one less than encoder layers
 
         if upsample_kwargs is None:
@@ -95,6 +104,7 @@ class UNetDecoder(AbstractDecoder):
 
         self.blocks = nn.ModuleList(blocks)
         self.upsamples = nn.ModuleList(upsamples)
+        self.gradient_checkpointing = gradient_checkpointing
         self.output_spec = FeatureMapsSpecification(channels=out_channels, strides=input_spec.strides[:-1])
 
     def _build_stage(
@@ -122,7 +132,10 @@ class UNetDecoder(AbstractDecoder):
             x = upsample_block(x, output_size=encoder_input.size()[2:])
 
             x = torch.cat([x, encoder_input], dim=1)
-            x = decoder_block(x)
+            if self.gradient_checkpointing and self.training and not torch.jit.is_scripting():
+                x = checkpoint(decoder_block, x, use_reentrant=False)
+            else:
+                x = decoder_block(x)
             outputs.append(x)
 
         # Returns list of tensors in same order as input (fine-to-coarse)
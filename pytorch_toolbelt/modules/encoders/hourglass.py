@@ -1,15 +1,22 @@
+import copy
 import inspect
 from collections import OrderedDict
-from typing import List, Callable, Tuple
+from typing import List, Callable, Tuple, Iterable
 
 import torch
+import torch.fx
 
-from pytorch_toolbelt.modules import ACT_RELU, get_activation_block
+from pytorch_toolbelt.inference.ensembling import _check_compile_available, _compile_module
+from pytorch_toolbelt.modules import ACT_RELU, get_activation_block, nearest_upsample2x_add
 from pytorch_toolbelt.modules.encoders import EncoderModule, make_n_channel_input
 from torch import nn, Tensor
+from torch.utils.checkpoint import checkpoint
 
 __all__ = ["StackedHGEncoder", "StackedSupervisedHGEncoder"]
 
+# Shape-dependent helper is kept as a leaf function when the encoder is symbolically traced for quantization
+torch.fx.wrap("nearest_upsample2x_add")
+
 
 def conv1x1_bn_act(in_channels, out_channels, activation=nn.ReLU):
     return nn.Sequential(
@@ -23,6 +30,56 @@ def conv1x1_bn_act(in_channels, out_channels, activation=nn.ReLU):
     )
 
 
+class AffineChannelwise(nn.Module):
+    """
+    Per-channel affine transform y = x * scale + shift, computed with a single kernel.
+    Used as inference-time replacement of BatchNorm layer that cannot be folded into adjacent convolution.
+    """
+
+    def __init__(self, scale: Tensor, shift: Tensor):
+        super().__init__()
+        self.register_buffer("scale", scale.detach().clone().reshape(1, -1, 1, 1))
+        self.register_buffer("shift", shift.detach().clone().reshape(1, -1, 1, 1))
+
+    @classmethod
+    @torch.no_grad()
+    def from_batchnorm(cls, bn: nn.BatchNorm2d) -> "AffineChannelwise":
+        scale = torch.rsqrt(bn.running_var + bn.eps)
+        shift = -bn.running_mean * scale
+        if bn.affine:
+            scale = scale * bn.weight
+            shift = shift * bn.weight + bn.bias
+        return cls(scale, shift)
+
+    def forward(self, x: Tensor) -> Tensor:  # skipcq: PYL-W0221
+        return torch.addcmul(self.shift, x, self.scale)
+
+
+def _check_eval_mode(module: nn.Module, method_name: str) -> None:
+    """
+    Raise an error if module is in training mode, since running statistics of batch norm are used for inference.
+    """
+    if module.training:
+        raise RuntimeError(f"{method_name}() requires module to be in eval mode")
+
+
+@torch.no_grad()
+def _fuse_conv_bn(conv: nn.Conv2d, bn: nn.BatchNorm2d) -> None:
+    """
+    Fold BatchNorm (in eval mode) that directly follows convolution into convolution weight & bias in-place.
+
+    :param conv: Convolution layer. Bias is created if it's absent.
+    :param bn: BatchNorm layer that consumes output of the conv.
+    """
+    affine = AffineChannelwise.from_batchnorm(bn)
+    scale = affine.scale.reshape(-1)
+    shift = affine.shift.reshape(-1)
+
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(bn.running_mean)
+    conv.weight.mul_(scale.reshape(-1, 1, 1, 1))
+    conv.bias = nn.Parameter(bias * scale + shift)
+
+
 class HGResidualBlock(nn.Module):
     def __init__(self, input_channels: int, output_channels: int, reduction=2, activation: Callable = nn.ReLU):
         super(HGResidualBlock, self).__init__()
@@ -42,7 +99,8 @@ class HGResidualBlock(nn.Module):
         self.conv3 = nn.Conv2d(mid_channels, output_channels, kernel_size=1, bias=True)
 
         if input_channels == output_channels:
-            self.skip_layer = nn.Identity()
+            # Plain identity skip, so forward pass does not go through extra module call
+            self.skip_layer = None
         else:
             self.skip_layer = nn.Conv2d(input_channels, output_channels, kernel_size=1)
             torch.nn.init.zeros_(self.skip_layer.bias)
@@ -50,7 +108,10 @@ class HGResidualBlock(nn.Module):
         torch.nn.init.zeros_(self.conv3.bias)
 
     def forward(self, x: Tensor) -> Tensor:  # skipcq: PYL-W0221
-        residual = self.skip_layer(x)
+        if self.skip_layer is None:
+            residual = x
+        else:
+            residual = self.skip_layer(x)
 
         out = self.bn1(x)
         out = self.act1(out)
@@ -66,6 +127,19 @@ class HGResidualBlock(nn.Module):
         out += residual
         return out
 
+    def fuse_for_inference(self):
+        """Fold bn2 & bn3 into conv1 & conv2 and replace pre-activation bn1 with per-channel affine transform."""
+        _check_eval_mode(self, "fuse_for_inference")
+        if isinstance(self.bn1, nn.BatchNorm2d):
+            self.bn1 = AffineChannelwise.from_batchnorm(self.bn1)
+        if isinstance(self.bn2, nn.BatchNorm2d):
+            _fuse_conv_bn(self.conv1, self.bn2)
+            self.bn2 = nn.Identity()
+        if isinstance(self.bn3, nn.BatchNorm2d):
+            _fuse_conv_bn(self.conv2, self.bn3)
+            self.bn3 = nn.Identity()
+        return self
+
 
 class HGStemBlock(nn.Module):
     def __init__(self, input_channels, output_channels, activation: Callable = nn.ReLU):
@@ -94,6 +168,16 @@ class HGStemBlock(nn.Module):
         x = self.residual2(x)
         return x
 
+    def fuse_for_inference(self):
+        """Fold bn1, bn2 & bn3 into preceding convolutions and replace them with identity."""
+        _check_eval_mode(self, "fuse_for_inference")
+        for conv_name, bn_name in [("conv1", "bn1"), ("conv2", "bn2"), ("conv3", "bn3")]:
+            bn = getattr(self, bn_name)
+            if isinstance(bn, nn.BatchNorm2d):
+                _fuse_conv_bn(getattr(self, conv_name), bn)
+                setattr(self, bn_name, nn.Identity())
+        return self
+
 
 class HGBlock(nn.Module):
     """
@@ -109,7 +193,14 @@ class HGBlock(nn.Module):
         activation=nn.ReLU,
         repeats=1,
         pooling_block=nn.MaxPool2d,
+        gradient_checkpointing: bool = False,
     ):
+        """
+
+        :param gradient_checkpointing: If True, activations of the lower (downsampled) branch, including all nested
+            hourglass levels, are not stored during training, but recomputed in backward pass.
+            Nested levels are not checkpointed on their own, so the lower branch is recomputed only once.
+        """
         super(HGBlock, self).__init__()
         nf = features + increase
 
@@ -151,17 +242,23 @@ class HGBlock(nn.Module):
         else:
             self.low2 = HGResidualBlock(nf, nf, activation=activation)
         self.low3 = HGResidualBlock(nf, features, activation=activation)
-        self.up = nn.Upsample(scale_factor=2, mode="nearest")
+        self.gradient_checkpointing = gradient_checkpointing
 
     def forward(self, x: Tensor) -> Tensor:  # skipcq: PYL-W0221
         up1 = self.up1(x)
         pool1 = self.down(x)
+        if self.gradient_checkpointing and self.training and not torch.jit.is_scripting():
+            low3 = checkpoint(self._forward_lower, pool1, use_reentrant=False)
+        else:
+            low3 = self._forward_lower(pool1)
+        hg = nearest_upsample2x_add(up1, low3)
+        return hg
+
+    def _forward_lower(self, pool1: Tensor) -> Tensor:
         low1 = self.low1(pool1)
         low2 = self.low2(low1)
         low3 = self.low3(low2)
-        up2 = self.up(low3)
-        hg = up1 + up2
-        return hg
+        return low3
 
 
 class HGFeaturesBlock(nn.Module):
@@ -176,6 +273,14 @@ class HGFeaturesBlock(nn.Module):
         x = self.linear(x)
         return x
 
+    def fuse_for_inference(self):
+        """Fold batch norm of the linear block into it's convolution and replace it with identity."""
+        _check_eval_mode(self, "fuse_for_inference")
+        if isinstance(self.linear.bn, nn.BatchNorm2d):
+            _fuse_conv_bn(self.linear.conv, self.linear.bn)
+            self.linear.bn = nn.Identity()
+        return self
+
 
 class HGSupervisionBlock(nn.Module):
     def __init__(self, features, supervision_channels: int):
@@ -203,7 +308,13 @@ class StackedHGEncoder(EncoderModule):
         activation=ACT_RELU,
         repeats=1,
         pooling_block=nn.MaxPool2d,
+        gradient_checkpointing: bool = False,
     ):
+        """
+
+        :param gradient_checkpointing: If True, lower branches of hourglass blocks are recomputed in backward pass
+            instead of storing their activations. This trades extra compute for lower memory usage during training.
+        """
         super().__init__(
             channels=[features] + [features] * stack_level,
             strides=[4] + [4] * stack_level,
@@ -213,6 +324,7 @@ class StackedHGEncoder(EncoderModule):
         self.stack_level = stack_level
         self.depth_level = depth
         self.num_features = features
+        self.channels_last = False
 
         act = get_activation_block(activation)
         self.stem = HGStemBlock(input_channels, features, activation=act)
@@ -230,6 +342,7 @@ class StackedHGEncoder(EncoderModule):
                     activation=act,
                     repeats=repeats,
                     pooling_block=pooling_block,
+                    gradient_checkpointing=gradient_checkpointing,
                 )
             )
             input_features = features
@@ -247,6 +360,8 @@ class StackedHGEncoder(EncoderModule):
         return f"hg_s{self.stack_level}_d{self.depth_level}_f{self.num_features}"
 
     def forward(self, x: Tensor) -> List[Tensor]:  # skipcq: PYL-W0221
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         x = self.stem(x)
         outputs = [x]
 
@@ -255,10 +370,89 @@ class StackedHGEncoder(EncoderModule):
             outputs.append(features)
 
             if i < self.num_blocks - 1:
-                x = x + self.merge_features[i](features)
+                if i > 0 and not torch.is_grad_enabled():
+                    # After the first stack x is not referenced by outputs, so it can be updated in-place
+                    x = x.add_(self.merge_features[i](features))
+                else:
+                    x = x + self.merge_features[i](features)
 
         return outputs
 
+    def to_channels_last(self):
+        """
+        Convert encoder weights to channels-last (NHWC) memory format. Input tensors are converted to
+        the same memory format in forward pass, so all convolutions run in NHWC.
+        On GPUs with Tensor Cores this enables faster convolution kernels.
+
+        :return: self
+        """
+        self.channels_last = True
+        return self.to(memory_format=torch.channels_last)
+
+    def fuse_for_inference(self):
+        """
+        Fold batch normalization layers into adjacent convolutions for faster inference.
+        Model must be in eval mode. After fusion model cannot be trained anymore.
+
+        :return: self
+        """
+        _check_eval_mode(self, "fuse_for_inference")
+        for module in self.modules():
+            if isinstance(module, (HGStemBlock, HGResidualBlock, HGFeaturesBlock)):
+                module.fuse_for_inference()
+        return self
+
+    def compile_for_inference(self, mode: str = "reduce-overhead", backend: str = "inductor", fuse_bn: bool = True):
+        """
+        Compile encoder with torch.compile, so that element-wise operations around convolutions are fused.
+        Encoder must be in eval mode. Each new input shape triggers recompilation.
+
+        :param mode: Compilation mode passed to torch.compile
+        :param backend: Compilation backend passed to torch.compile
+        :param fuse_bn: If True, batch normalization layers are folded into convolutions of a copy of the encoder
+            before compilation (See fuse_for_inference). The encoder itself is not modified.
+        :return: Compiled encoder
+        """
+        _check_compile_available()
+        _check_eval_mode(self, "compile_for_inference")
+        model = copy.deepcopy(self).fuse_for_inference() if fuse_bn else self
+        return _compile_module(model, mode, backend=backend, fullgraph=False, dynamic=False)
+
+    @torch.no_grad()
+    def quantize_int8(self, calibration_inputs: Iterable[Tensor], backend: str = "x86") -> nn.Module:
+        """
+        Apply static post-training int8 quantization (FX graph mode) to a copy of the encoder.
+        Conv + BN (+ ReLU) sequences are fused, weights are quantized per-channel and ranges of activations
+        are calibrated on provided inputs. Supervision logits (if any) are kept in floating point.
+        Quantized encoder runs on CPU with quantized engine matching the backend
+        (See torch.backends.quantized.engine).
+
+        :param calibration_inputs: Iterable of input tensors (on CPU) to calibrate activations ranges
+        :param backend: Quantization backend ("x86", "fbgemm" or "qnnpack")
+        :return: Quantized copy of the encoder
+        """
+        try:
+            from torch.ao.quantization import get_default_qconfig_mapping
+            from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+        except ImportError:
+            raise RuntimeError("quantize_int8() requires PyTorch 1.13 or newer (QConfigMapping API).")
+
+        _check_eval_mode(self, "quantize_int8")
+
+        qconfig_mapping = get_default_qconfig_mapping(backend)
+        for name, module in self.named_modules():
+            if isinstance(module, HGSupervisionBlock):
+                qconfig_mapping.set_module_name(f"{name}.squeeze", None)
+
+        calibration_inputs = iter(calibration_inputs)
+        example_input = next(calibration_inputs)
+
+        model = prepare_fx(copy.deepcopy(self), qconfig_mapping, example_inputs=(example_input,))
+        model(example_input)
+        for x in calibration_inputs:
+            model(x)
+        return convert_fx(model)
+
     def change_input_channels(self, input_channels: int, mode="auto", **kwargs):
         self.stem.conv1 = make_n_channel_input(self.stem.conv1, input_channels, mode)
         return self
@@ -280,6 +474,7 @@ class StackedSupervisedHGEncoder(StackedHGEncoder):
         repeats=1,
         pooling_block=nn.MaxPool2d,
         supervision_block=HGSupervisionBlock,
+        gradient_checkpointing: bool = False,
     ):
         super().__init__(
             input_channels=input_channels,
@@ -289,6 +484,7 @@ class StackedSupervisedHGEncoder(StackedHGEncoder):
             activation=activation,
             repeats=repeats,
             pooling_block=pooling_block,
+            gradient_checkpointing=gradient_checkpointing,
         )
 
         self.supervision_blocks = nn.ModuleList(
@@ -296,6 +492,8 @@ class StackedSupervisedHGEncoder(StackedHGEncoder):
         )
 
     def forward(self, x: Tensor) -> Tuple[List[Tensor], List[Tensor]]:  # skipcq: PYL-W0221
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
         x = self.stem(x)
         outputs = [x]
         supervision = []
@@ -307,6 +505,10 @@ class StackedSupervisedHGEncoder(StackedHGEncoder):
             if i < self.num_blocks - 1:
                 sup_mask, sup_features = self.supervision_blocks[i](features)
                 supervision.append(sup_mask)
-                x = x + self.merge_features[i](features) + sup_features
+                if i > 0 and not torch.is_grad_enabled():
+                    # After the first stack x is not referenced by outputs, so it can be updated in-place
+                    x = x.add_(self.merge_features[i](features)).add_(sup_features)
+                else:
+                    x = x + self.merge_features[i](features) + sup_features
 
         return outputs, supervision
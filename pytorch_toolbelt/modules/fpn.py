@@ -1,12 +1,13 @@
 from __future__ import absolute_import
 
-from typing import List
+from typing import List, Optional
 
 import torch
 from torch import nn, Tensor
 from torch.nn import functional as F
 
 from ..modules.activations import ABN
+from ..modules.upsample import nearest_upsample2x_add, resolve_align_corners
 
 __all__ = ["FPNContextBlock", "FPNBottleneckBlock", "FPNFuse", "FPNFuseSum", "HFF"]
 
@@ -108,20 +109,71 @@ class FPNBottleneckBlock(nn.Module):
 
 
 class FPNFuse(nn.Module):
-    def __init__(self, mode="bilinear", align_corners=False):
+    def __init__(self, mode="bilinear", align_corners=False, reuse_output_buffer: bool = False):
+        """
+
+        :param mode: Interpolation mode
+        :param align_corners: Interpolation align corners mode (Ignored for non-interpolating modes)
+        :param reuse_output_buffer: If True, during inference (when grad is disabled) feature maps are written into
+            an output buffer that is allocated once and reused across calls while input shapes stay the same.
+            Note that output of the previous call is overwritten by the next call, so it must be consumed
+            (or copied) before calling the module again. This saves allocation of the output tensor on each call
+            (amount of copied memory is the same as for torch.cat). Buffer is a cache and not a module state:
+            it is released by .to()/.cpu()/.half() and is not pickled or deep-copied.
+        """
         super().__init__()
         self.mode = mode
-        self.align_corners = align_corners
+        self.align_corners = resolve_align_corners(mode, align_corners)
+        self.reuse_output_buffer = reuse_output_buffer
+        self._output_buffer: Optional[Tensor] = None
 
     def forward(self, features: List[Tensor]):  # skipcq: PYL-W0221
+        if self.reuse_output_buffer and not torch.is_grad_enabled() and not torch.jit.is_scripting():
+            return self._forward_into_buffer(features)
+
         layers = []
-        dst_size = features[0].size()[2:]  # Skip B, C, and use rest (This works for 1D, 2D, 3D and ND..)
+        dst_size = features[0].shape[2:]  # Skip B, C, and use rest (This works for 1D, 2D, 3D and ND..)
 
         for f in features:
-            layers.append(F.interpolate(f, size=dst_size, mode=self.mode, align_corners=self.align_corners))
+            if f.shape[2:] != dst_size:
+                f = F.interpolate(f, size=dst_size, mode=self.mode, align_corners=self.align_corners)
+            layers.append(f)
 
         return torch.cat(layers, dim=1)
 
+    def _apply(self, fn, *args, **kwargs):
+        # Drop cached buffer instead of keeping a stale copy on the old device / dtype
+        self._output_buffer = None
+        return super()._apply(fn, *args, **kwargs)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_output_buffer"] = None
+        return state
+
+    @torch.jit.unused
+    def _forward_into_buffer(self, features: List[Tensor]) -> Tensor:
+        first = features[0]
+        output_shape = (first.size(0), sum(f.size(1) for f in features)) + tuple(first.shape[2:])
+        buffer = self._output_buffer
+        if (
+            buffer is None
+            or buffer.shape != output_shape
+            or buffer.dtype != first.dtype
+            or buffer.device != first.device
+        ):
+            buffer = first.new_empty(output_shape)
+            self._output_buffer = buffer
+
+        dst_size = first.shape[2:]
+        offset = 0
+        for f in features:
+            if f.shape[2:] != dst_size:
+                f = F.interpolate(f, size=dst_size, mode=self.mode, align_corners=self.align_corners)
+            buffer[:, offset : offset + f.size(1)].copy_(f)
+            offset += f.size(1)
+        return buffer
+
 
 class FPNFuseSum(nn.Module):
     """Compute a sum of individual FPN layers"""
@@ -129,14 +181,20 @@ class FPNFuseSum(nn.Module):
     def __init__(self, mode="bilinear", align_corners=False):
         super().__init__()
         self.mode = mode
-        self.align_corners = align_corners
+        self.align_corners = resolve_align_corners(mode, align_corners)
 
     def forward(self, features: List[Tensor]) -> Tensor:  # skipcq: PYL-W0221
         output = features[0]
-        dst_size = features[0].size()[2:]  # Skip B, C, and use rest (This works for 1D, 2D, 3D and ND..)
-
-        for f in features[1:]:
-            output = output + F.interpolate(f, size=dst_size, mode=self.mode, align_corners=self.align_corners)
+        dst_size = features[0].shape[2:]  # Skip B, C, and use rest (This works for 1D, 2D, 3D and ND..)
+
+        for i, f in enumerate(features[1:]):
+            if f.shape[2:] != dst_size:
+                f = F.interpolate(f, size=dst_size, mode=self.mode, align_corners=self.align_corners)
+            if i == 0:
+                # Out-of-place to not modify the input feature map
+                output = output + f
+            else:
+                output.add_(f)
 
         return output
 
@@ -166,6 +224,10 @@ class HFF(nn.Module):
 
         current_map = features[-1]
         for feature_map_index in reversed(range(num_feature_maps - 1)):
+            if self.sizes is None and self.upsample_scale == 2 and self.interpolation_mode == "nearest":
+                current_map = nearest_upsample2x_add(features[feature_map_index], current_map)
+                continue
+
             if self.sizes is not None:
                 prev_upsampled = self._upsample(current_map, self.sizes[feature_map_index])
             else:
@@ -2,8 +2,10 @@ from typing import Optional, List
 
 import torch.jit
 from torch import nn, Tensor
+from torch.nn import functional as F
 
-from pytorch_toolbelt.modules import FPNFuse, instantiate_activation_block, instantiate_normalization_block
+from pytorch_toolbelt.modules import instantiate_activation_block, instantiate_normalization_block
+from pytorch_toolbelt.modules.upsample import resolve_align_corners
 from pytorch_toolbelt.modules.interfaces import AbstractHead, FeatureMapsSpecification
 
 __all__ = ["HypercolumnHead"]
@@ -14,6 +16,11 @@ class HypercolumnHead(AbstractHead):
     Hypercolumn head that concatenates all input feature maps to the size of the largest feature map, compute
     a projection (using conv + bn + act) and resize the projected feature map to the original image size.
 
+    Since 1x1 convolution and interpolation are both linear and commute, concatenation followed by 1x1 projection
+    is computed as a sum of per-feature-map projections (using slices of the same convolution weight)
+    resized to the size of the largest feature map. This avoids materializing the wide concatenated tensor
+    at the highest resolution, while keeping the same parameters as the concatenation-based formulation.
+
     Reference: https://arxiv.org/pdf/1411.5752.pdf
     """
 
@@ -32,8 +39,11 @@ class HypercolumnHead(AbstractHead):
     ):
         super().__init__(input_spec)
         channels = sum(input_spec.channels)
-        self.fuse = FPNFuse(mode=interpolation_mode, align_corners=interpolation_align_corners)
+        self.input_channels: List[int] = list(input_spec.channels)
 
+        # Layout of projection is fixed (and kept for state dict compatibility): projection[0] is 1x1 convolution
+        # that is applied per input feature map in _fused_projection(), followed by normalization, activation
+        # and dropout (projection[1], projection[2] and projection[3]) that are applied to the fused result.
         self.projection = nn.Sequential(
             nn.Conv2d(channels, mid_channels, kernel_size=1),
             instantiate_normalization_block(normalization, mid_channels),
@@ -45,11 +55,13 @@ class HypercolumnHead(AbstractHead):
         self.output_name = output_name
         self.output_spec = FeatureMapsSpecification(channels=(num_classes,), strides=(1,))
         self.interpolation_mode = interpolation_mode
-        self.interpolation_align_corners = interpolation_align_corners
+        self.interpolation_align_corners = resolve_align_corners(interpolation_mode, interpolation_align_corners)
 
     def forward(self, feature_maps: List[Tensor], output_size: torch.Size):
-        x = self.fuse(feature_maps)
-        x = self.projection(x)
+        x = self._fused_projection(feature_maps)
+        x = self.projection[1](x)
+        x = self.projection[2](x)
+        x = self.projection[3](x)
         x = self.final(x)
 
         output = torch.nn.functional.interpolate(
@@ -60,3 +72,21 @@ class HypercolumnHead(AbstractHead):
             return {self.output_name: output}
         else:
             return output
+
+    def _fused_projection(self, feature_maps: List[Tensor]) -> Tensor:
+        """
+        Equivalent of projection[0](FPNFuse(feature_maps)) without concatenation of resized feature maps.
+        """
+        conv: nn.Conv2d = self.projection[0]
+        weights = torch.split(conv.weight, self.input_channels, dim=1)
+        dst_size = feature_maps[0].size()[2:]
+
+        output = F.conv2d(feature_maps[0], weights[0], conv.bias)
+        for i in range(1, len(feature_maps)):
+            x = F.conv2d(feature_maps[i], weights[i])
+            if x.size()[2:] != dst_size:
+                x = F.interpolate(
+                    x, size=dst_size, mode=self.interpolation_mode, align_corners=self.interpolation_align_corners
+                )
+            output = output + x
+        return output
@@ -4,6 +4,7 @@ import torch.jit
 from torch import nn, Tensor
 
 from pytorch_toolbelt.modules.interfaces import AbstractHead, FeatureMapsSpecification
+from pytorch_toolbelt.modules.upsample import icnr_init
 
 __all__ = ["ResizeHead"]
 
@@ -24,6 +25,7 @@ class ResizeHead(AbstractHead):
         dropout_inplace: bool = False,
         interpolation_mode="bilinear",
         interpolation_align_corners=False,
+        pixel_shuffle: bool = False,
     ):
         """
         Initialize prediction head
@@ -32,10 +34,14 @@ class ResizeHead(AbstractHead):
         :param num_classes: Number of classes to predict
         :param output_name: Name of the output tensor. If None, returns tensor directly, otherwise returns dict with { output_name: tensor }
         :param kernel_size: Convolution kernel size. Padding is automatically computed to using kernel_size // 2 formula.
-        :param dropout_rate: Dropout rate to apply before convolution.
+        :param dropout_rate: Dropout rate to apply before convolution. Dropout is applied only in training mode.
         :param dropout_inplace: If True, applies dropout in-place.
         :param interpolation_mode: Interpolation mode to use for upsampling. See torch.nn.functional.interpolate for details.
         :param interpolation_align_corners: Interpolation align corners mode to use for upsampling. See torch.nn.functional.interpolate for details.
+        :param pixel_shuffle: If True, convolution predicts stride^2 values per class, that are rearranged with
+            pixel shuffle to the input image size (Sub-pixel convolution). Weights are initialized with ICNR,
+            so at initialization the output is equal to nearest upsampling. Interpolation is used only if
+            output size is not equal to the feature map size multiplied by its stride.
         """
 
         super().__init__(input_spec)
@@ -43,9 +49,27 @@ class ResizeHead(AbstractHead):
         self.output_name = output_name
 
         channels = input_spec.channels[self.target_feature_map_index]
+        self.target_feature_map_stride = input_spec.strides[self.target_feature_map_index]
 
-        self.dropout = nn.Dropout2d(dropout_rate, inplace=dropout_inplace)
-        self.final = nn.Conv2d(channels, num_classes, kernel_size=kernel_size, padding=kernel_size // 2, bias=True)
+        if dropout_rate > 0:
+            self.dropout = nn.Dropout2d(dropout_rate, inplace=dropout_inplace)
+        else:
+            self.dropout = nn.Identity()
+        self.upscale_factor = self.target_feature_map_stride if pixel_shuffle else 1
+        self.final = nn.Conv2d(
+            channels,
+            num_classes * self.upscale_factor**2,
+            kernel_size=kernel_size,
+            padding=kernel_size // 2,
+            bias=True,
+        )
+        if self.upscale_factor > 1:
+            with torch.no_grad():
+                self.final.weight.copy_(
+                    icnr_init(self.final.weight, self.upscale_factor, initializer=nn.init.kaiming_normal_)
+                )
+                bias = self.final.bias[:num_classes].clone()
+                self.final.bias.copy_(bias.repeat_interleave(self.upscale_factor**2))
 
         self.output_spec = FeatureMapsSpecification(channels=(num_classes,), strides=(1,))
 
@@ -53,21 +77,35 @@ class ResizeHead(AbstractHead):
         self.interpolation_align_corners = interpolation_align_corners
 
     def forward(
-        self, feature_maps: List[Tensor], output_size: Union[Tuple[int, int], torch.Size]
+        self, feature_maps: List[Tensor], output_size: Optional[Union[Tuple[int, int], torch.Size]] = None
     ) -> Union[Tensor, Tuple[Tensor, ...], List[Tensor], Mapping[str, Tensor]]:
         """
 
         :param feature_maps: Input features (from encoder, decoder or neck, etc.)
         :param output_size:  The desired output size (rows, cols) of the output feature map.
+            If None, the size of the target feature map multiplied by its stride is used.
         :return:
         """
         x = feature_maps[self.target_feature_map_index]
-        x = self.dropout(x)
+        if output_size is None:
+            output_size = (x.size(2) * self.target_feature_map_stride, x.size(3) * self.target_feature_map_stride)
+
+        if self.training:
+            x = self.dropout(x)
         x = self.final(x)
 
-        output = torch.nn.functional.interpolate(
-            x, size=output_size, mode=self.interpolation_mode, align_corners=self.interpolation_align_corners
-        )
+        if self.upscale_factor > 1:
+            x = torch.nn.functional.pixel_shuffle(x, self.upscale_factor)
+            if x.size(2) == output_size[0] and x.size(3) == output_size[1]:
+                output = x
+            else:
+                output = torch.nn.functional.interpolate(
+                    x, size=output_size, mode=self.interpolation_mode, align_corners=self.interpolation_align_corners
+                )
+        else:
+            output = torch.nn.functional.interpolate(
+                x, size=output_size, mode=self.interpolation_mode, align_corners=self.interpolation_align_corners
+            )
 
         if self.output_name is not None:
             return {self.output_name: output}
@@ -7,6 +7,8 @@ from torch import nn, Tensor
 
 __all__ = [
     "bilinear_upsample_initializer",
+    "nearest_upsample2x_add",
+    "resolve_align_corners",
     "icnr_init",
     "AbstractResizeLayer",
     "PixelShuffle",
@@ -44,6 +46,33 @@ class AbstractResizeLayer(nn.Module):
         raise NotImplementedError
 
 
+def nearest_upsample2x_add(x: Tensor, y: Tensor) -> Tensor:
+    """
+    Computes x + F.interpolate(y, scale_factor=2, mode="nearest") without materializing upsampled copy of y.
+    Since nearest 2x upsampling is a pure broadcast, x is viewed as [B, C, H, 2, W, 2], y as [B, C, H, 1, W, 1]
+    and result is computed with a single element-wise addition.
+
+    :param x: Tensor of shape [B, C, 2*H, 2*W]
+    :param y: Tensor of shape [B, C, H, W]
+    :return: Tensor of shape [B, C, 2*H, 2*W]
+    """
+    batch_size, channels, height, width = y.size()
+    if x.size(2) != height * 2 or x.size(3) != width * 2:
+        return x + torch.nn.functional.interpolate(y, scale_factor=2.0, mode="nearest")
+
+    output = x.view(batch_size, channels, height, 2, width, 2) + y.unsqueeze(3).unsqueeze(5)
+    return output.reshape(x.size())
+
+
+def resolve_align_corners(mode: str, align_corners: Optional[bool]) -> Optional[bool]:
+    """
+    F.interpolate accepts align_corners only for interpolating modes and raises an error otherwise.
+    """
+    if mode in {"linear", "bilinear", "bicubic", "trilinear"}:
+        return align_corners
+    return None
+
+
 def bilinear_upsample_initializer(x):
     cc = x.size(2) // 2
     cr = x.size(3) // 2
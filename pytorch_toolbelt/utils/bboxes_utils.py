@@ -2,9 +2,6 @@ from collections import namedtuple
 from typing import Optional
 
 import numpy as np
-import torch
-from pytorch_toolbelt.utils import to_numpy
-from torchvision.ops import box_iou
 
 __all__ = ["match_bboxes", "match_bboxes_hungarian", "BBoxesMatchResult"]
 
@@ -27,7 +24,70 @@ BBoxesMatchResult = namedtuple(
 )
 
 
-@torch.no_grad()
+def _box_iou(boxes1: np.ndarray, boxes2: np.ndarray) -> np.ndarray:
+    """
+    Compute pairwise intersection over union of two sets of boxes.
+
+    :param boxes1: Boxes in [x1, y1, x2, y2] format of shape [N,4]
+    :param boxes2: Boxes in [x1, y1, x2, y2] format of shape [M,4]
+    :return: IoU matrix of shape [N,M]
+    """
+    boxes1 = np.asarray(boxes1, dtype=np.float32)
+    boxes2 = np.asarray(boxes2, dtype=np.float32)
+
+    lt = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = np.clip(rb - lt, a_min=0, a_max=None)
+    intersection = wh[..., 0] * wh[..., 1]
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def _count_labels(labels: np.ndarray, num_classes: int) -> np.ndarray:
+    """
+    Count number of occurrences of each class label
+
+    :param labels: Array of class labels of shape [N]
+    :param num_classes: Total number of classes
+    :return: Array of shape [num_classes]
+    """
+    return np.bincount(np.asarray(labels).astype(int, copy=False), minlength=num_classes)
+
+
+def _count_matches(
+    pred_classes: np.ndarray,
+    true_classes: np.ndarray,
+    true_positives: np.ndarray,
+    false_positives: np.ndarray,
+    false_negatives: np.ndarray,
+    confusion_matrix: np.ndarray,
+) -> np.ndarray:
+    """
+    Update per-class counts and confusion matrix (in-place) for pairs of matched predicted and ground-truth boxes.
+
+    :param pred_classes: Labels of matched predicted boxes of shape [K]
+    :param true_classes: Labels of matched ground-truth boxes of shape [K]
+    :return: Boolean mask of shape [K] of matches where predicted class equals ground-truth class
+    """
+    num_classes = len(true_positives)
+    pred_classes = np.asarray(pred_classes).astype(int, copy=False)
+    true_classes = np.asarray(true_classes).astype(int, copy=False)
+    np.add.at(confusion_matrix, (true_classes, pred_classes), 1)
+
+    # If there is a matching bbox found above, increase the count of true positives by one (TP).
+    same_class = pred_classes == true_classes
+    true_positives += _count_labels(true_classes[same_class], num_classes)
+
+    # If classes does not match, then we add false-positive for predicted class and
+    # false-negative to target class
+    false_positives += _count_labels(pred_classes[~same_class], num_classes)
+    false_negatives += _count_labels(true_classes[~same_class], num_classes)
+    return same_class
+
+
 def match_bboxes(
     pred_boxes: np.ndarray,
     pred_labels: np.ndarray,
@@ -85,9 +145,8 @@ def match_bboxes(
             true_positive_indexes=np.zeros((0, 2), dtype=int),
         )
     elif num_pred_objects == 0:
-        for true_class in true_labels:
-            false_negatives[true_class] += 1
-            confusion_matrix[true_class, none_class] += 1
+        false_negatives += _count_labels(true_labels, num_classes)
+        confusion_matrix[:num_classes, none_class] = false_negatives
         return BBoxesMatchResult(
             true_positives=true_positives,
             false_positives=false_positives,
@@ -96,9 +155,8 @@ def match_bboxes(
             true_positive_indexes=np.zeros((0, 2), dtype=int),
         )
     elif num_true_objects == 0:
-        for pred_class in pred_labels:
-            false_positives[pred_class] += 1
-            confusion_matrix[none_class, pred_class] += 1
+        false_positives += _count_labels(pred_labels, num_classes)
+        confusion_matrix[none_class, :num_classes] = false_positives
         return BBoxesMatchResult(
             true_positives=true_positives,
             false_positives=false_positives,
@@ -109,54 +167,51 @@ def match_bboxes(
 
     # Reorder predictions to start matching with the most confident ones
     order = np.argsort(-pred_scores)
-    rorder = np.argsort(order)
     pred_boxes = pred_boxes[order]
     pred_labels = pred_labels[order]
     #
-    iou_matrix: np.ndarray = to_numpy(
-        box_iou(torch.from_numpy(pred_boxes).float(), torch.from_numpy(true_boxes).float())
-    )
-
-    remainig_preds = np.ones(num_pred_objects, dtype=bool)
-    remainig_trues = np.ones(num_true_objects, dtype=bool)
-    true_positive_indexes = []
-
-    for ci in range(num_true_objects):
-        # Find a first prediction box with IoU greater than or equal iou threshold with a groundtruth box
-        candidates = np.flatnonzero(iou_matrix[:, ci] >= iou_threshold)
-        if len(candidates):
-            ri = candidates[0]
+    iou_matrix = _box_iou(pred_boxes, true_boxes)
 
-            iou_matrix[ri, :] = 0
+    row_ind = []
+    col_ind = []
 
-            remainig_preds[ri] = False
-            remainig_trues[ci] = False
+    # If no pair of boxes has IoU above the threshold, all boxes stay unmatched
+    if iou_matrix.max() >= iou_threshold:
+        for ci in range(num_true_objects):
+            # Find a first prediction box with IoU greater than or equal iou threshold with a groundtruth box
+            candidates = iou_matrix[:, ci] >= iou_threshold
+            ri = int(np.argmax(candidates))
+            if candidates[ri]:
+                iou_matrix[ri, :] = 0
+                row_ind.append(ri)
+                col_ind.append(ci)
 
-            pred_class = pred_labels[ri]
-            true_class = true_labels[ci]
+    row_ind = np.array(row_ind, dtype=int)
+    col_ind = np.array(col_ind, dtype=int)
 
-            if pred_class == true_class:
-                # If there is a matching bbox found above, increase the count of true positives by one (TP).
-                true_positives[true_class] += 1
-                # Inverse indexe of predicted boxes here to keep the order of original (unsorted) bboxes
-                true_positive_indexes.append((rorder[ri], ci))
-            else:
-                # If classes does not match, then we add false-positive for predicted class and
-                # false-negative to target class
-                false_positives[pred_class] += 1
-                false_negatives[true_class] += 1
+    remainig_preds = np.ones(num_pred_objects, dtype=bool)
+    remainig_trues = np.ones(num_true_objects, dtype=bool)
+    remainig_preds[row_ind] = False
+    remainig_trues[col_ind] = False
 
-            confusion_matrix[true_class, pred_class] += 1
+    same_class = _count_matches(
+        pred_labels[row_ind],
+        true_labels[col_ind],
+        true_positives=true_positives,
+        false_positives=false_positives,
+        false_negatives=false_negatives,
+        confusion_matrix=confusion_matrix,
+    )
+    # Map index of sorted predicted box back to the index in original (unsorted) bboxes
+    true_positive_indexes = np.stack([order[row_ind[same_class]], col_ind[same_class]], axis=1)
 
-    if remainig_preds.any():
-        for pred_class in pred_labels[remainig_preds]:
-            false_positives[pred_class] += 1
-            confusion_matrix[none_class, pred_class] += 1
+    unmatched_preds = _count_labels(pred_labels[remainig_preds], num_classes)
+    false_positives += unmatched_preds
+    confusion_matrix[none_class, :num_classes] += unmatched_preds
 
-    if remainig_trues.any():
-        for true_class in true_labels[remainig_trues]:
-            false_negatives[true_class] += 1
-            confusion_matrix[true_class, none_class] += 1
+    unmatched_trues = _count_labels(true_labels[remainig_trues], num_classes)
+    false_negatives += unmatched_trues
+    confusion_matrix[:num_classes, none_class] += unmatched_trues
 
     return BBoxesMatchResult(
         true_positives=true_positives,
@@ -167,7 +222,6 @@ def match_bboxes(
     )
 
 
-@torch.no_grad()
 def match_bboxes_hungarian(
     pred_boxes: np.ndarray,
     pred_labels: np.ndarray,
@@ -223,9 +277,8 @@ def match_bboxes_hungarian(
             true_positive_indexes=np.zeros((0, 2), dtype=int),
         )
     elif num_pred_objects == 0:
-        for true_class in true_labels:
-            false_negatives[true_class] += 1
-            confusion_matrix[true_class, none_class] += 1
+        false_negatives += _count_labels(true_labels, num_classes)
+        confusion_matrix[:num_classes, none_class] = false_negatives
         return BBoxesMatchResult(
             true_positives=true_positives,
             false_positives=false_positives,
@@ -234,9 +287,8 @@ def match_bboxes_hungarian(
             true_positive_indexes=np.zeros((0, 2), dtype=int),
         )
     elif num_true_objects == 0:
-        for pred_class in pred_labels:
-            false_positives[pred_class] += 1
-            confusion_matrix[none_class, pred_class] += 1
+        false_positives += _count_labels(pred_labels, num_classes)
+        confusion_matrix[none_class, :num_classes] = false_positives
         return BBoxesMatchResult(
             true_positives=true_positives,
             false_positives=false_positives,
@@ -245,41 +297,39 @@ def match_bboxes_hungarian(
             true_positive_indexes=np.zeros((0, 2), dtype=int),
         )
 
-    iou_matrix = to_numpy(box_iou(torch.from_numpy(pred_boxes).float(), torch.from_numpy(true_boxes).float()))
-    row_ind, col_ind = linear_sum_assignment(iou_matrix, maximize=True)
+    iou_matrix = _box_iou(pred_boxes, true_boxes)
+    if iou_matrix.max() >= iou_threshold:
+        row_ind, col_ind = linear_sum_assignment(iou_matrix, maximize=True)
+    else:
+        # No pair of boxes can be matched, so there is no need to solve the assignment problem
+        row_ind = col_ind = np.zeros(0, dtype=int)
+
+    matched = iou_matrix[row_ind, col_ind] >= iou_threshold
+    row_ind = row_ind[matched]
+    col_ind = col_ind[matched]
 
     remainig_preds = np.ones(num_pred_objects, dtype=bool)
     remainig_trues = np.ones(num_true_objects, dtype=bool)
+    remainig_preds[row_ind] = False
+    remainig_trues[col_ind] = False
+
+    same_class = _count_matches(
+        pred_labels[row_ind],
+        true_labels[col_ind],
+        true_positives=true_positives,
+        false_positives=false_positives,
+        false_negatives=false_negatives,
+        confusion_matrix=confusion_matrix,
+    )
+    true_positive_indexes = np.stack([row_ind[same_class], col_ind[same_class]], axis=1)
+
+    unmatched_preds = _count_labels(pred_labels[remainig_preds], num_classes)
+    false_positives += unmatched_preds
+    confusion_matrix[none_class, :num_classes] += unmatched_preds
 
-    true_positive_indexes = []
-
-    for ri, ci in zip(row_ind, col_ind):
-        pred_class = pred_labels[ri]
-        true_class = true_labels[ci]
-        if iou_matrix[ri, ci] >= iou_threshold:
-            remainig_preds[ri] = False
-            remainig_trues[ci] = False
-            if pred_class == true_class:
-                # If there is a matching polygon found above, increase the count of true positives by one (TP).
-                true_positives[true_class] += 1
-                true_positive_indexes.append((ri, ci))
-            else:
-                # If classes does not match, then we add false-positive for predicted class and
-                # false-negative to target class
-                false_positives[pred_class] += 1
-                false_negatives[true_class] += 1
-
-            confusion_matrix[true_class, pred_class] += 1
-
-    if remainig_preds.any():
-        for pred_class in pred_labels[remainig_preds]:
-            false_positives[pred_class] += 1
-            confusion_matrix[none_class, pred_class] += 1
-
-    if remainig_trues.any():
-        for true_class in true_labels[remainig_trues]:
-            false_negatives[true_class] += 1
-            confusion_matrix[true_class, none_class] += 1
+    unmatched_trues = _count_labels(true_labels[remainig_trues], num_classes)
+    false_negatives += unmatched_trues
+    confusion_matrix[:num_classes, none_class] += unmatched_trues
 
     return BBoxesMatchResult(
         true_positives=true_positives,
@@ -129,16 +129,47 @@ def auto_file(filename: str, where: str = ".") -> str:
     return files[0]
 
 
-def read_rgb_image(fname: Union[str, Path]) -> np.ndarray:
+_TURBO_JPEG = None
+
+
+def _get_turbojpeg():
+    """
+    Lazily instantiate TurboJPEG decoder.
+    :return: TurboJPEG instance or False if PyTurboJPEG or libjpeg-turbo is not available
+    """
+    global _TURBO_JPEG
+    if _TURBO_JPEG is None:
+        try:
+            from turbojpeg import TurboJPEG
+
+            _TURBO_JPEG = TurboJPEG()
+        except (ImportError, OSError, RuntimeError):
+            _TURBO_JPEG = False
+    return _TURBO_JPEG
+
+
+def read_rgb_image(fname: Union[str, Path], use_turbojpeg: bool = False) -> np.ndarray:
     """
     Read RGB image from filesystem in RGB color order.
     Note: By default, OpenCV loads images in BGR memory order format.
     :param fname: Image file path
+    :param use_turbojpeg: If True and PyTurboJPEG is installed, JPEG files are decoded with
+        SIMD-accelerated libjpeg-turbo, which is notably faster than OpenCV.
+        Note that unlike OpenCV, TurboJPEG does not apply EXIF orientation.
+        Other formats are always read with OpenCV.
     :return: A numpy array with a loaded image in RGB format
     """
     if type(fname) != str:
         fname = str(fname)
 
+    if use_turbojpeg and has_ext(fname, (".jpg", ".jpeg")):
+        turbojpeg = _get_turbojpeg()
+        if turbojpeg:
+            from turbojpeg import TJPF_RGB
+
+            with open(fname, "rb") as f:
+                return turbojpeg.decode(f.read(), pixel_format=TJPF_RGB)
+
     image = cv2.imread(fname, cv2.IMREAD_COLOR)
     if image is None:
         raise IOError(f'Cannot read image "{fname}"')
@@ -19,8 +19,13 @@ __all__ = [
     "vstack_header",
     "grid_stack",
     "plot_heatmap",
+    "overlay_binary_segmentation",
 ]
 
+# Colors for (target, prediction) pairs indexed by code = target * 2 + prediction:
+# background, false positive (yellow), false negative (red), true positive (green)
+BINARY_SEGMENTATION_PALETTE = np.array([[0, 0, 0], [250, 250, 0], [250, 0, 0], [0, 250, 0]], dtype=np.uint8)
+
 
 def plot_heatmap(
     cm: np.ndarray,
@@ -238,6 +243,30 @@ def render_figure_to_tensor(figure):
     return image
 
 
+def overlay_binary_segmentation(
+    image: np.ndarray, target: np.ndarray, prediction: np.ndarray, alpha: float = 0.5
+) -> np.ndarray:
+    """
+    Draw true positive (green), false positive (yellow) and false negative (red) pixels
+    of binary segmentation on top of the image.
+
+    Args:
+        image: RGB image of [H,W,3] shape and uint8 dtype
+        target: Ground-truth mask of [H,W] shape. Positive values are treated as foreground.
+        prediction: Predicted mask (or logits) of [H,W] shape. Positive values are treated as foreground.
+        alpha: Weight of the overlay
+
+    Returns:
+        RGB image of [H,W,3] shape
+    """
+    # Pack both binary masks into a 2-bit code and map it to colors with a single lookup
+    code = (target > 0).astype(np.uint8)
+    code <<= 1
+    code |= prediction > 0
+    overlay = BINARY_SEGMENTATION_PALETTE[code]
+    return cv2.addWeighted(image, 1 - alpha, overlay, alpha, 0)
+
+
 def hstack_autopad(images: Iterable[np.ndarray], pad_value: int = 0) -> np.ndarray:
     """
     Stack images horizontally with automatic padding
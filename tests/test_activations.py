@@ -1,7 +1,8 @@
 import torch
 import pytest
+import torch.nn.functional as F
 
-from pytorch_toolbelt.modules.activations import instantiate_activation_block
+from pytorch_toolbelt.modules.activations import instantiate_activation_block, hard_sigmoid, hard_swish
 
 skip_if_no_cuda = pytest.mark.skipif(not torch.cuda.is_available(), reason="Cuda is not available")
 
@@ -32,3 +33,45 @@ def test_activations_cuda(activation_name):
     x = torch.randn(128).half().cuda()
     y = act(x)
     assert y.dtype == torch.float16
+
+
+@pytest.mark.parametrize("activation_name", ["swish", "mish"])
+def test_memory_efficient_activations_match_naive(activation_name):
+    act = instantiate_activation_block(activation_name)
+    ref = instantiate_activation_block(activation_name + "_naive")
+
+    x = torch.randn(1024).double()
+    with torch.no_grad():
+        torch.testing.assert_close(act(x), ref(x))
+
+    x1 = x.clone().requires_grad_(True)
+    x2 = x.clone().requires_grad_(True)
+    act(x1).sum().backward()
+    ref(x2).sum().backward()
+    torch.testing.assert_close(x1.grad, x2.grad)
+
+
+@pytest.mark.parametrize("inplace", [False, True])
+def test_hard_activations_match_reference(inplace):
+    # Reference formulas of the previous implementation
+    references = {
+        hard_sigmoid: lambda x: F.relu6(x + 3) / 6,
+        hard_swish: lambda x: x * F.relu6(x + 3) / 6,
+    }
+    x = torch.randn(1024).double() * 4
+
+    for fn, reference in references.items():
+        input = x.clone()
+        with torch.no_grad():
+            output = fn(input, inplace=inplace)
+        torch.testing.assert_close(output, reference(x))
+        if inplace:
+            assert output.data_ptr() == input.data_ptr()
+        else:
+            torch.testing.assert_close(input, x)
+
+        x1 = x.clone().requires_grad_(True)
+        x2 = x.clone().requires_grad_(True)
+        fn(x1).sum().backward()
+        reference(x2).sum().backward()
+        torch.testing.assert_close(x1.grad, x2.grad)
@@ -41,3 +41,18 @@ def test_decoders(decoder_cls, decoder_params):
     pprint(describe_outputs(output))
 
     torch.jit.trace(decoder, (input,))
+
+
+def test_unet_decoder_gradient_checkpointing():
+    input_spec = FeatureMapsSpecification(channels=(16, 32, 64), strides=(4, 8, 16))
+    inputs = [x.requires_grad_(True) for x in input_spec.get_dummy_input(image_size=(64, 64))]
+
+    decoder = D.UNetDecoder(input_spec, out_channels=[16, 32])
+    checkpointed = D.UNetDecoder(input_spec, out_channels=[16, 32], gradient_checkpointing=True)
+    checkpointed.load_state_dict(decoder.state_dict())
+
+    for expected, actual in zip(decoder(inputs), checkpointed(inputs)):
+        torch.testing.assert_close(actual, expected)
+
+    sum(x.sum() for x in checkpointed(inputs)).backward()
+    assert all(x.grad is not None for x in inputs)
@@ -1,5 +1,6 @@
 import pytest
 import torch
+from torch import nn
 
 import pytorch_toolbelt.modules.encoders as E
 from pytorch_toolbelt.modules import AbstractEncoder
@@ -282,6 +283,113 @@ def test_hourglass_encoder(encoder, encoder_params):
         assert feature_map.size(3) * expected_stride == 256
 
 
+@torch.no_grad()
+def test_hourglass_encoder_fuse_for_inference():
+    net = E.StackedHGEncoder(stack_level=2, depth=2, features=32)
+    for module in net.modules():
+        if isinstance(module, nn.BatchNorm2d):
+            module.running_mean.uniform_(-1, 1)
+            module.running_var.uniform_(0.5, 2)
+            module.weight.uniform_(0.5, 2)
+            module.bias.uniform_(-1, 1)
+    net.eval()
+
+    x = torch.rand((2, 3, 64, 64))
+    expected = net(x)
+    actual = net.fuse_for_inference()(x)
+    assert not any(isinstance(module, nn.BatchNorm2d) for module in net.modules())
+    for expected_map, actual_map in zip(expected, actual):
+        torch.testing.assert_close(actual_map, expected_map, rtol=1e-4, atol=1e-4)
+
+
+@torch.no_grad()
+@pytest.mark.skipif(not hasattr(torch, "compile"), reason="torch.compile requires PyTorch 2.0 or newer")
+def test_hourglass_encoder_compile_for_inference():
+    net = E.StackedHGEncoder(stack_level=2, depth=2, features=32).eval()
+    x = torch.rand((2, 3, 64, 64))
+    expected = net(x)
+
+    compiled = net.compile_for_inference(mode="default", backend="eager")
+    actual = compiled(x)
+    # Batch norm is folded into a copy of the encoder, original encoder is left intact
+    assert any(isinstance(module, nn.BatchNorm2d) for module in net.modules())
+    for expected_map, actual_map in zip(expected, actual):
+        torch.testing.assert_close(actual_map, expected_map, rtol=1e-4, atol=1e-4)
+
+
+@torch.no_grad()
+def test_hourglass_encoder_channels_last():
+    net = E.StackedHGEncoder(stack_level=2, depth=2, features=32).eval()
+    x = torch.rand((2, 3, 64, 64))
+    expected = net(x)
+    actual = net.to_channels_last()(x)
+    assert actual[0].is_contiguous(memory_format=torch.channels_last)
+    for expected_map, actual_map in zip(expected, actual):
+        torch.testing.assert_close(actual_map, expected_map, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize("encoder", [E.StackedHGEncoder, E.StackedSupervisedHGEncoder])
+def test_hourglass_encoder_inplace_merge(encoder):
+    params = {"supervision_channels": 1} if encoder == E.StackedSupervisedHGEncoder else {}
+    net = encoder(stack_level=3, depth=2, features=32, **params).eval()
+    x = torch.rand((2, 3, 64, 64))
+
+    expected = net(x)
+    with torch.no_grad():
+        actual = net(x)
+
+    if encoder == E.StackedSupervisedHGEncoder:
+        expected, actual = expected[0], actual[0]
+    for expected_map, actual_map in zip(expected, actual):
+        torch.testing.assert_close(actual_map, expected_map)
+
+
+def test_hourglass_encoder_gradient_checkpointing():
+    x = torch.rand((2, 3, 64, 64))
+    net = E.StackedHGEncoder(stack_level=2, depth=2, features=32).eval()
+    net_ckpt = E.StackedHGEncoder(stack_level=2, depth=2, features=32, gradient_checkpointing=True).eval()
+    net_ckpt.load_state_dict(net.state_dict())
+    # Train mode to enable checkpointing, but BatchNorm stays in eval mode to get deterministic outputs
+    net.blocks.train()
+    net_ckpt.blocks.train()
+    for module in list(net.modules()) + list(net_ckpt.modules()):
+        if isinstance(module, nn.BatchNorm2d):
+            module.eval()
+
+    net(x)[-1].sum().backward()
+    net_ckpt(x)[-1].sum().backward()
+    for p, p_ckpt in zip(net.parameters(), net_ckpt.parameters()):
+        if p.grad is not None:
+            torch.testing.assert_close(p_ckpt.grad, p.grad, rtol=1e-4, atol=1e-4)
+
+
+def _has_qconfig_mapping() -> bool:
+    try:
+        from torch.ao.quantization import get_default_qconfig_mapping  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@torch.no_grad()
+@pytest.mark.skipif(not _has_qconfig_mapping(), reason="Requires QConfigMapping (torch>=1.13)")
+@pytest.mark.skipif("x86" not in torch.backends.quantized.supported_engines, reason="x86 quantized engine")
+def test_hourglass_encoder_quantize_int8():
+    net = E.StackedHGEncoder(stack_level=3, depth=2, features=32).eval()
+    calibration_inputs = [torch.rand((2, 3, 64, 64)) for _ in range(8)]
+
+    quantized = net.quantize_int8(calibration_inputs)
+    x = calibration_inputs[0]
+    expected = net(x)
+    actual = quantized(x)
+    assert len(actual) == len(expected)
+    for expected_map, actual_map in zip(expected, actual):
+        assert actual_map.dtype == torch.float32
+        assert actual_map.size() == expected_map.size()
+        relative_error = (actual_map - expected_map).abs().mean() / expected_map.abs().mean()
+        assert relative_error < 0.1
+
+
 @pytest.mark.parametrize(["encoder", "encoder_params"], [[E.StackedSupervisedHGEncoder, {"supervision_channels": 1}]])
 @torch.no_grad()
 @skip_if_no_cuda
@@ -1,6 +1,11 @@
 import os.path
+import sys
 from pathlib import Path
 
+import cv2
+import numpy as np
+
+from pytorch_toolbelt.utils import fs
 from pytorch_toolbelt.utils.fs import read_rgb_image, read_image_as_is, change_extension
 
 lena_str_name = os.path.join(os.path.dirname(__file__), "lena.png")
@@ -35,3 +40,30 @@ def test_change_extension_str():
 def test_change_extension_pathlib():
     assert change_extension(lena_path, "jpeg") == lena_path_jpeg
     assert change_extension(lena_path, ".jpeg") == lena_path_jpeg
+
+
+def _write_lena_jpeg(tmp_path) -> str:
+    fname = str(tmp_path / "lena.jpg")
+    cv2.imwrite(fname, cv2.imread(lena_str_name))
+    return fname
+
+
+def test_read_rgb_image_turbojpeg(tmp_path):
+    fname = _write_lena_jpeg(tmp_path)
+    expected = read_rgb_image(fname)
+    # Decoded with libjpeg-turbo if PyTurboJPEG is installed and with OpenCV otherwise
+    actual = read_rgb_image(fname, use_turbojpeg=True)
+    assert actual.shape == expected.shape == (220, 220, 3)
+    assert actual.dtype == np.uint8
+    assert np.abs(actual.astype(int) - expected.astype(int)).mean() < 1
+
+
+def test_read_rgb_image_turbojpeg_fallback(tmp_path, monkeypatch):
+    fname = _write_lena_jpeg(tmp_path)
+    # Simulate missing PyTurboJPEG
+    monkeypatch.setitem(sys.modules, "turbojpeg", None)
+    monkeypatch.setattr(fs, "_TURBO_JPEG", None)
+
+    actual = read_rgb_image(fname, use_turbojpeg=True)
+    assert fs._TURBO_JPEG is False
+    np.testing.assert_equal(actual, read_rgb_image(fname))
@@ -234,6 +234,23 @@ def test_soft_bce_loss():
     print(loss)
 
 
+@torch.no_grad()
+@pytest.mark.parametrize("dtype", [torch.float16, torch.bfloat16])
+@pytest.mark.parametrize(
+    "criterion",
+    [L.SoftBCEWithLogitsLoss(smooth_factor=0.1, ignore_index=-100), L.BalancedBCEWithLogitsLoss(ignore_index=-100)],
+)
+def test_bce_losses_computed_in_fp32(criterion, dtype):
+    y_pred = (torch.randn((2, 1, 32, 32)) * 20).to(dtype)
+    y_true = torch.randint(0, 2, (2, 1, 32, 32)).long()
+    y_true[:, :, :4] = -100
+
+    loss = criterion(y_pred, y_true)
+    expected = criterion(y_pred.float(), y_true)
+    assert loss.dtype == torch.float32
+    assert torch.isfinite(loss)
+    torch.testing.assert_close(loss, expected)
+
 @pytest.mark.parametrize(
     "criterion",
     [
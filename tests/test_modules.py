@@ -1,6 +1,18 @@
+import copy
+
 import pytest
 import torch
-from pytorch_toolbelt.modules import HFF, ResidualDeconvolutionUpsample2d, GlobalKMaxPool2d
+from pytorch_toolbelt.modules import (
+    HFF,
+    ResidualDeconvolutionUpsample2d,
+    GlobalKMaxPool2d,
+    HypercolumnHead,
+    ResizeHead,
+    FPNFuse,
+    FPNFuseSum,
+    nearest_upsample2x_add,
+)
+from pytorch_toolbelt.modules.interfaces import FeatureMapsSpecification
 
 skip_if_no_cuda = pytest.mark.skipif(not torch.cuda.is_available(), reason="Cuda is not available")
 
@@ -66,3 +78,90 @@ def test_kmax_pool():
 
     assert y1.size() == (8, 512)
     assert y2.size() == (8, 512, 1, 1)
+
+
+@torch.no_grad()
+def test_hypercolumn_head_matches_concatenation():
+    spec = FeatureMapsSpecification(channels=(8, 16, 32), strides=(4, 8, 16))
+    head = HypercolumnHead(spec, num_classes=3, activation="relu", normalization="bn", mid_channels=16).eval()
+    feature_maps = [torch.randn((2, 8, 32, 32)), torch.randn((2, 16, 16, 16)), torch.randn((2, 32, 8, 8))]
+
+    expected = head.projection[0](FPNFuse()(feature_maps))
+    actual = head._fused_projection(feature_maps)
+    torch.testing.assert_close(actual, expected, rtol=1e-4, atol=1e-4)
+
+    output = head(feature_maps, output_size=(128, 128))
+    assert output.size() == (2, 3, 128, 128)
+
+    head = HypercolumnHead(
+        spec, num_classes=3, activation="relu", normalization="bn", mid_channels=16, interpolation_mode="nearest"
+    ).eval()
+    assert head(feature_maps, output_size=(128, 128)).size() == (2, 3, 128, 128)
+
+
+@pytest.mark.parametrize("channels_last", [False, True])
+def test_nearest_upsample2x_add(channels_last):
+    x = torch.randn((2, 8, 32, 48))
+    y = torch.randn((2, 8, 16, 24))
+    if channels_last:
+        x = x.to(memory_format=torch.channels_last)
+        y = y.to(memory_format=torch.channels_last)
+
+    expected = x + torch.nn.functional.interpolate(y, scale_factor=2, mode="nearest")
+    torch.testing.assert_close(nearest_upsample2x_add(x, y), expected)
+
+
+def test_fpn_fuse():
+    feature_maps = [torch.randn((2, 4, 32, 32)), torch.randn((2, 8, 32, 32)), torch.randn((2, 4, 16, 16))]
+    upsampled = [
+        torch.nn.functional.interpolate(f, size=(32, 32), mode="bilinear", align_corners=False) for f in feature_maps
+    ]
+
+    torch.testing.assert_close(FPNFuse()(feature_maps), torch.cat(upsampled, dim=1))
+
+    inputs = [feature_maps[0], feature_maps[1][:, :4], feature_maps[2]]
+    original = inputs[0].clone()
+    expected = upsampled[0] + upsampled[1][:, :4] + upsampled[2]
+    torch.testing.assert_close(FPNFuseSum()(inputs), expected)
+    torch.testing.assert_close(inputs[0], original)
+
+    output = FPNFuse(mode="nearest", align_corners=False)(feature_maps)
+    assert output.size() == (2, 16, 32, 32)
+
+
+def test_resize_head_default_output_size():
+    spec = FeatureMapsSpecification(channels=(8, 16), strides=(4, 8))
+    head = ResizeHead(spec, num_classes=3, dropout_rate=0.2).eval()
+    feature_maps = [torch.randn((2, 8, 32, 32)), torch.randn((2, 16, 16, 16))]
+
+    assert head(feature_maps).size() == (2, 3, 128, 128)
+    assert head(feature_maps, output_size=(100, 100)).size() == (2, 3, 100, 100)
+
+
+def test_resize_head_pixel_shuffle():
+    spec = FeatureMapsSpecification(channels=(8, 16), strides=(4, 8))
+    head = ResizeHead(spec, num_classes=3, pixel_shuffle=True).eval()
+    feature_maps = [torch.randn((2, 8, 32, 32)), torch.randn((2, 16, 16, 16))]
+
+    output = head(feature_maps)
+    assert output.size() == (2, 3, 128, 128)
+    # ICNR initialization makes sub-pixel convolution equivalent to nearest upsampling
+    torch.testing.assert_close(
+        output, torch.nn.functional.interpolate(output[:, :, ::4, ::4], scale_factor=4, mode="nearest")
+    )
+
+    assert head(feature_maps, output_size=(100, 100)).size() == (2, 3, 100, 100)
+
+
+@torch.no_grad()
+def test_fpn_fuse_reuse_output_buffer():
+    feature_maps = [torch.randn((2, 4, 32, 32)), torch.randn((2, 8, 16, 16))]
+    fuse = FPNFuse(reuse_output_buffer=True)
+
+    output = fuse(feature_maps)
+    torch.testing.assert_close(output, FPNFuse()(feature_maps))
+    assert fuse(feature_maps).data_ptr() == output.data_ptr()
+
+    assert copy.deepcopy(fuse)._output_buffer is None
+    fuse.double()
+    assert fuse._output_buffer is None
@@ -1,6 +1,9 @@
+import math
+
 import numpy as np
 import torch
-from pytorch_toolbelt.inference.tiles import ImageSlicer, CudaTileMerger
+import torch.nn.functional as F
+from pytorch_toolbelt.inference.tiles import ImageSlicer, TileMerger, predict_tiled
 from pytorch_toolbelt.utils.torch_utils import tensor_from_rgb_image, rgb_image_from_tensor, to_numpy
 from torch import nn
 from torch.utils.data import DataLoader
@@ -32,7 +35,7 @@ def test_tiles_split_merge_non_dividable_cuda():
     tiler = ImageSlicer(image.shape, tile_size=(1280, 1280), tile_step=(1280, 1280), weight="mean")
     tiles = tiler.split(image)
 
-    merger = CudaTileMerger(tiler.target_shape, channels=image.shape[2], weight=tiler.weight)
+    merger = TileMerger(tiler.target_shape, channels=image.shape[2], weight=tiler.weight, device="cuda")
     for tile, coordinates in zip(tiles, tiler.crops):
         # Integrate as batch of size 1
         merger.integrate_batch(tensor_from_rgb_image(tile).unsqueeze(0).float().cuda(), [coordinates])
@@ -72,7 +75,7 @@ def test_tiles_split_merge_cuda():
 
     model = MaxChannelIntensity().eval().cuda()
 
-    merger = CudaTileMerger(tiler.target_shape, 1, tiler.weight)
+    merger = TileMerger(tiler.target_shape, 1, tiler.weight, device="cuda")
     for tiles_batch, coords_batch in DataLoader(list(zip(tiles, tiler.crops)), batch_size=8, pin_memory=True):
         tiles_batch = tiles_batch.float().cuda()
         pred_batch = model(tiles_batch)
@@ -83,3 +86,52 @@ def test_tiles_split_merge_cuda():
     merged = tiler.crop_to_orignal_size(merged)
 
     np.testing.assert_equal(merged, image.max(axis=2, keepdims=True))
+
+
+@pytest.mark.parametrize(
+    ["tile_size", "tile_step", "weight"], [(64, 64, "mean"), (64, 32, "mean"), (64, 48, "pyramid")]
+)
+def test_predict_tiled(tile_size, tile_step, weight):
+    image = torch.rand((2, 3, 150, 201))
+    tiler = ImageSlicer((150, 201), tile_size=tile_size, tile_step=tile_step, weight=weight)
+
+    output = predict_tiled(lambda x: x * 2, image, tile_size, tile_step, batch_size=5, weight=tiler.weight)
+    assert output.size() == image.size()
+    torch.testing.assert_close(output, image * 2)
+
+
+def _position_dependent_model(x):
+    # Output depends on the position within tile differently along rows and columns
+    rows = torch.arange(x.size(2), dtype=x.dtype).view(-1, 1)
+    cols = torch.arange(x.size(3), dtype=x.dtype).view(1, -1)
+    return x * 2 + rows * 0.01 + cols * 0.1
+
+
+def _predict_tiled_reference(model, image, tile_size, tile_step, weight):
+    (th, tw), (sh, sw) = tile_size, tile_step
+    rows, cols = image.shape[2:]
+    padded_rows = max(0, math.ceil((rows - th) / sh)) * sh + th
+    padded_cols = max(0, math.ceil((cols - tw) / sw)) * sw + tw
+    image = F.pad(image, [0, padded_cols - cols, 0, padded_rows - rows])
+
+    output = torch.zeros_like(image)
+    norm_mask = torch.zeros_like(image)
+    for y in range(0, padded_rows - th + 1, sh):
+        for x in range(0, padded_cols - tw + 1, sw):
+            output[:, :, y : y + th, x : x + tw] += model(image[:, :, y : y + th, x : x + tw]) * weight
+            norm_mask[:, :, y : y + th, x : x + tw] += weight
+    return (output / norm_mask)[:, :, :rows, :cols]
+
+
+@pytest.mark.parametrize(
+    ["image_size", "tile_size", "tile_step"],
+    [((150, 201), (64, 48), (32, 40)), ((150, 201), (48, 64), (48, 16)), ((40, 50), (64, 96), (32, 48))],
+)
+def test_predict_tiled_matches_per_tile_loop(image_size, tile_size, tile_step):
+    image = torch.rand((2, 3) + image_size, dtype=torch.float64)
+    weight = torch.rand(tile_size, dtype=torch.float64) + 0.5
+
+    output = predict_tiled(_position_dependent_model, image, tile_size, tile_step, batch_size=5, weight=weight)
+    expected = _predict_tiled_reference(_position_dependent_model, image, tile_size, tile_step, weight)
+    assert output.size() == image.size()
+    torch.testing.assert_close(output, expected, rtol=1e-6, atol=1e-6)
@@ -1,4 +1,5 @@
 from collections import defaultdict
+import pickle
 
 import cv2
 import numpy as np
@@ -7,6 +8,13 @@ import torch
 from torch import nn
 
 from pytorch_toolbelt.inference import tta
+from pytorch_toolbelt.inference.ensembling import (
+    Ensembler,
+    ApplySigmoidTo,
+    ApplySoftmaxTo,
+    PickModelOutput,
+    SelectByIndex,
+)
 from pytorch_toolbelt.utils.torch_utils import to_numpy
 
 skip_if_no_cuda = pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA is not available")
@@ -28,6 +36,15 @@ class SumAll(nn.Module):
         return input.sum(dim=[1, 2, 3])
 
 
+class ScaleDict(nn.Module):
+    def __init__(self, scale: float):
+        super().__init__()
+        self.scale = scale
+
+    def forward(self, input):
+        return {"logits": input * self.scale, "features": input + self.scale}
+
+
 def test_d4_image2mask():
     x = torch.rand((4, 3, 224, 224))
     model = NoOp()
@@ -106,3 +123,73 @@ def test_tencrop_image2label():
     expected = (2 * ((1 + 2 + 5 + 6) + (3 + 4 + 7 + 8) + (9 + 0 + 3 + 4) + (1 + 2 + 5 + 6) + (6 + 7 + 0 + 1))) / 10
 
     assert int(output) == expected
+
+
+@pytest.mark.parametrize("reduction", ["mean", "sum", "gmean", "hmean", "logodd"])
+@pytest.mark.parametrize("num_models", [1, 3, 5, 6])
+def test_ensembler(reduction, num_models):
+    x = torch.rand((2, 3, 16, 16)) * 0.5 + 0.1
+    models = [ScaleDict(0.5 * (i + 1)) for i in range(num_models)]
+
+    output = Ensembler(models, reduction=reduction)(x)
+    assert set(output.keys()) == {"logits", "features"}
+    for key in output.keys():
+        expected = tta._deaugment_averaging(torch.stack([model(x)[key] for model in models]), reduction)
+        torch.testing.assert_close(output[key], expected)
+
+    output = Ensembler(models, reduction=reduction, outputs=["logits"])(x)
+    assert set(output.keys()) == {"logits"}
+
+
+def test_activation_wrappers_are_scriptable():
+    x = torch.randn((2, 3, 16, 16))
+    model = ScaleDict(2.0)
+
+    sigmoid = torch.jit.script(ApplySigmoidTo(model, output_key=["logits", "logits"]))
+    torch.testing.assert_close(sigmoid(x)["logits"], (x * 2.0).sigmoid())
+
+    softmax = torch.jit.script(ApplySoftmaxTo(model, output_key="logits", temperature=2))
+    torch.testing.assert_close(softmax(x)["logits"], (x * 4.0).softmax(dim=1))
+
+    pick = torch.jit.script(PickModelOutput(model, "features"))
+    torch.testing.assert_close(pick(x), x + 2.0)
+
+    select = torch.jit.script(SelectByIndex("logits"))
+    torch.testing.assert_close(select(model(x)), x * 2.0)
+
+    # Integer keys are supported in eager mode
+    torch.testing.assert_close(SelectByIndex(1)([x, x + 1]), x + 1)
+
+
+class AddDict(nn.Module):
+    def forward(self, x, y, scale: float = 1.0):
+        return {"logits": (x + y) * scale}
+
+
+def test_wrappers_pass_multiple_inputs():
+    x = torch.randn((2, 3, 16, 16))
+    y = torch.randn((2, 3, 16, 16))
+    model = AddDict()
+
+    torch.testing.assert_close(ApplySigmoidTo(model)(x, y, scale=2.0)["logits"], ((x + y) * 2.0).sigmoid())
+    torch.testing.assert_close(ApplySoftmaxTo(model)(x, y)["logits"], (x + y).softmax(dim=1))
+    torch.testing.assert_close(PickModelOutput(model, "logits")(x, y), x + y)
+
+    ensemble = Ensembler([ApplySigmoidTo(model), ApplySigmoidTo(model, temperature=2)])
+    expected = ((x + y).sigmoid() + ((x + y) * 2).sigmoid()) * 0.5
+    torch.testing.assert_close(ensemble(x, y)["logits"], expected)
+    assert Ensembler.__doc__ is not None
+
+@pytest.mark.skipif(not hasattr(torch, "compile"), reason="torch.compile requires PyTorch 2.0 or newer")
+def test_compiled_activation_wrappers_are_picklable():
+    x = torch.randn((2, 3, 16, 16))
+    for wrapper in [
+        ApplySigmoidTo(ScaleDict(2.0), output_key="logits", compile_model=True),
+        ApplySoftmaxTo(ScaleDict(2.0), output_key="logits", compile_model=True),
+    ]:
+        restored = pickle.loads(pickle.dumps(wrapper))
+        assert restored.compile_mode == wrapper.compile_mode
+        assert set(restored(x).keys()) == {"logits", "features"}
+        # Compiled forward is dropped from pickled state and re-created lazily
+        restored = pickle.loads(pickle.dumps(restored))
+        assert restored._compiled_forward is None
@@ -1,3 +1,4 @@
+import cv2
 import numpy as np
 import pytest
 import torch
@@ -8,7 +9,13 @@ from pytorch_toolbelt.inference.functional import (
     pad_tensor_to_size,
 )
 from pytorch_toolbelt.modules.encoders import make_n_channel_input
-from pytorch_toolbelt.utils import match_bboxes, match_bboxes_hungarian, get_collate_for_dataset
+from pytorch_toolbelt.utils import (
+    match_bboxes,
+    match_bboxes_hungarian,
+    get_collate_for_dataset,
+    to_channels_last,
+    CudaPrefetcher,
+)
 from torch import nn
 from torch.utils.data import ConcatDataset
 from functools import partial
@@ -238,6 +245,62 @@ def test_match_bboxes_hungarian(
     np.testing.assert_equal(result.confusion_matrix, confusion_matrix)
 
 
+def test_match_bboxes_true_positive_indexes_with_unsorted_scores():
+    true_boxes = np.array([[0, 0, 10, 10], [20, 20, 30, 30], [40, 40, 50, 50]])
+    true_labels = np.array([0, 0, 0])
+    # Predicted box i matches ground-truth box [1, 0, 2][i], scores are not sorted
+    pred_boxes = np.array([[20, 20, 30, 30], [0, 0, 10, 10], [40, 40, 50, 50]])
+    pred_labels = np.array([0, 0, 0])
+    pred_scores = np.array([0.2, 0.9, 0.5])
+
+    result = match_bboxes(pred_boxes, pred_labels, pred_scores, true_boxes, true_labels, num_classes=1)
+    np.testing.assert_equal(result.true_positive_indexes, [[1, 0], [0, 1], [2, 2]])
+    np.testing.assert_equal(result.true_positives, [3])
+
+
+@pytest.mark.parametrize("hungarian", [False, True])
+def test_match_bboxes_no_overlap(hungarian):
+    pred_boxes = np.array([[0, 0, 10, 10], [20, 20, 30, 30]])
+    pred_labels = np.array([0, 1])
+    true_boxes = np.array([[50, 50, 60, 60]])
+    true_labels = np.array([1])
+
+    if hungarian:
+        result = match_bboxes_hungarian(pred_boxes, pred_labels, true_boxes, true_labels, num_classes=2)
+    else:
+        pred_scores = np.array([0.9, 0.8])
+        result = match_bboxes(pred_boxes, pred_labels, pred_scores, true_boxes, true_labels, num_classes=2)
+
+    np.testing.assert_equal(result.true_positives, [0, 0])
+    np.testing.assert_equal(result.false_positives, [1, 1])
+    np.testing.assert_equal(result.false_negatives, [0, 1])
+    np.testing.assert_equal(result.confusion_matrix, [[0, 0, 0], [0, 0, 1], [1, 1, 0]])
+    assert result.true_positive_indexes.shape == (0, 2)
+
+
+def test_compute_weight_mask():
+    # Datasets module depends on albumentations, which is not a required dependency
+    pytest.importorskip("albumentations")
+    from pytorch_toolbelt.datasets.segmentation import compute_weight_mask
+
+    mask = np.zeros((64, 64), dtype=np.uint8)
+    mask[10:30, 20:50] = 1
+    mask[40:55, 5:15] = 2
+
+    kernel = np.ones((5, 5), dtype=np.uint8)
+    binary_mask = mask > 0
+    dilated = cv2.dilate(binary_mask.astype(np.uint8), kernel) > 0
+    eroded = cv2.erode(binary_mask.astype(np.uint8), kernel) > 0
+    edges = (dilated & ~binary_mask) | (binary_mask & ~eroded)
+    expected = cv2.GaussianBlur(edges.astype(np.float32) * 4 + 1, ksize=(5, 5), sigmaX=5)
+
+    weight_mask = compute_weight_mask(mask, edge_weight=4)
+    assert weight_mask.dtype == np.float32
+    np.testing.assert_allclose(weight_mask, expected, rtol=1e-6)
+
+    np.testing.assert_equal(compute_weight_mask(np.zeros((8, 8), dtype=np.uint8)), np.ones((8, 8), dtype=np.float32))
+
+
 def my_collate_fn(batch, some_arg):
     return batch
 
@@ -266,3 +329,36 @@ def test_get_collate_for_dataset():
         get_collate_for_dataset(datasets_with_different_collate, ensure_collate_fn_are_the_same=True)
 
     get_collate_for_dataset(datasets_with_same_collate, ensure_collate_fn_are_the_same=True)
+
+
+def test_to_channels_last():
+    model = nn.Sequential(nn.Conv2d(3, 8, kernel_size=3, padding=1), nn.BatchNorm2d(8), nn.ReLU()).eval()
+    x = torch.randn((2, 3, 32, 32))
+    expected = model(x)
+
+    model = to_channels_last(model)
+    inputs = to_channels_last({"image": x, "label": torch.tensor([0, 1])})
+    assert inputs["image"].is_contiguous(memory_format=torch.channels_last)
+    assert inputs["label"].dim() == 1
+
+    actual = model(inputs["image"])
+    assert actual.is_contiguous(memory_format=torch.channels_last)
+    torch.testing.assert_close(actual, expected, atol=1e-5, rtol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "device", ["cpu", pytest.param("cuda", marks=pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA"))]
+)
+@pytest.mark.parametrize("use_staging_buffers", [False, True])
+def test_cuda_prefetcher(device, use_staging_buffers):
+    batches = [{"image": torch.randn((2, 3, 8, 8)), "image_id": ["a", "b"]} for _ in range(3)]
+    prefetcher = CudaPrefetcher(batches, device=device, use_staging_buffers=use_staging_buffers)
+    assert len(prefetcher) == 3
+
+    num_batches = 0
+    for expected, actual in zip(batches, prefetcher):
+        assert actual["image"].device.type == device
+        assert actual["image_id"] == expected["image_id"]
+        torch.testing.assert_close(actual["image"].cpu(), expected["image"])
+        num_batches += 1
+    assert num_batches == 3
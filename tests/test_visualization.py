@@ -1,6 +1,6 @@
 import numpy as np
 
-from pytorch_toolbelt.utils import plot_confusion_matrix, plot_heatmap
+from pytorch_toolbelt.utils import plot_confusion_matrix, plot_heatmap, overlay_binary_segmentation
 
 
 def test_plot_confusion_matrix():
@@ -15,3 +15,15 @@ def test_plot_heatmap():
     cm = np.random.randn(20, 30)
 
     plot_heatmap(cm, title="Test", x_label="30", y_label="20", fname="test_plot_heatmap.png", noshow=False)
+
+
+def test_overlay_binary_segmentation():
+    image = np.full((2, 2, 3), 100, dtype=np.uint8)
+    target = np.array([[0, 0], [1, 1]], dtype=np.uint8)
+    logits = np.array([[-1.0, 2.0], [-3.0, 4.0]], dtype=np.float32)
+
+    overlay = overlay_binary_segmentation(image, target, logits, alpha=1.0)
+    np.testing.assert_array_equal(overlay[0, 0], [0, 0, 0])
+    np.testing.assert_array_equal(overlay[0, 1], [250, 250, 0])
+    np.testing.assert_array_equal(overlay[1, 0], [250, 0, 0])
+    np.testing.assert_array_equal(overlay[1, 1], [0, 250, 0])